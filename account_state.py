@@ -0,0 +1,161 @@
+import json
+import threading
+import traceback
+import requests
+import oanda_client
+
+ORDER_TYPES = {'MARKET_ORDER', 'LIMIT_ORDER', 'STOP_ORDER', 'MARKET_IF_TOUCHED_ORDER',
+               'TAKE_PROFIT_ORDER', 'STOP_LOSS_ORDER', 'TRAILING_STOP_LOSS_ORDER'}
+ORDER_CLOSED_TYPES = {'ORDER_CANCEL', 'ORDER_FILL'}
+
+
+class AccountState:
+    """In-memory balance, open positions and pending orders for one account.
+
+    Seeded once over REST, then kept current from order fill responses and the
+    transactions stream, and reconciled against REST on a timer. Reads never touch
+    the network.
+    """
+
+    def __init__(self, api_key=None, account_id=None):
+        self.api_key = api_key
+        self.account_id = account_id
+        self._lock = threading.Lock()
+        self.balance = None
+        self.positions = {}  # Net units per instrument (positive long, negative short)
+        self.pending_orders = {}  # Order id -> create transaction
+        self.last_transaction_id = 0
+        self._stop_event = threading.Event()
+        self.threads = []
+
+    def get_position(self, instrument):
+        """Open position for an instrument, in the shape get_open_positions returns."""
+        units = self.positions.get(instrument)
+        if not units:
+            return None
+        return {'type': 'buy' if units > 0 else 'sell', 'units': str(units)}
+
+    def seed(self):
+        """Load the account summary, open positions and pending orders over REST."""
+        path = f"/v3/accounts/{self.account_id}"
+        summary = oanda_client.get(f"{path}/summary", self.api_key)
+        positions = oanda_client.get(f"{path}/openPositions", self.api_key)
+        orders = oanda_client.get(f"{path}/pendingOrders", self.api_key)
+        for response in (summary, positions, orders):
+            if response.status_code != 200:
+                print(f"Error seeding account state: {response.status_code} - {response.text}")
+                return False
+
+        account = summary.json().get('account', {})
+        net_positions = {}
+        for pos in positions.json().get('positions', []):
+            units = float(pos['long']['units']) + float(pos['short']['units'])
+            if units:
+                net_positions[pos['instrument']] = units
+        pending = {order['id']: order for order in orders.json().get('orders', [])}
+
+        last_id = summary.json().get('lastTransactionID', account.get('lastTransactionID'))
+        with self._lock:
+            if last_id is not None and self.last_transaction_id > int(last_id):
+                # A fill was applied after the REST snapshot was taken; keep the newer local state
+                print(f"Skipped reconcile: local state at transaction {self.last_transaction_id} "
+                      f"is newer than the account summary ({last_id})")
+                return True
+            if self.balance is not None and net_positions != self.positions:
+                print(f"Reconciled positions: {self.positions} -> {net_positions}")
+            self.balance = float(account.get('balance', 0))
+            self.positions = net_positions
+            self.pending_orders = pending
+            if last_id is not None:
+                self.last_transaction_id = max(self.last_transaction_id, int(last_id))
+        return True
+
+    def apply_order_response(self, response):
+        """Update from the JSON body returned when an order is placed."""
+        for key in ('orderCreateTransaction', 'orderFillTransaction', 'orderCancelTransaction'):
+            transaction = response.get(key)
+            if transaction:
+                self.apply_transaction(transaction)
+
+    def apply_transaction(self, transaction):
+        """Apply one transaction, skipping any already seen by id."""
+        with self._lock:
+            transaction_id = transaction.get('id')
+            if transaction_id is not None:
+                transaction_id = int(transaction_id)
+                if transaction_id <= self.last_transaction_id:
+                    return
+                self.last_transaction_id = transaction_id
+
+            kind = transaction.get('type')
+            if kind in ORDER_TYPES and transaction_id is not None:
+                self.pending_orders[str(transaction_id)] = transaction
+            elif kind in ORDER_CLOSED_TYPES:
+                self.pending_orders.pop(str(transaction.get('orderID')), None)
+
+            if kind == 'ORDER_FILL':
+                instrument = transaction.get('instrument')
+                units = self.positions.get(instrument, 0) + float(transaction.get('units', 0))
+                if units:
+                    self.positions[instrument] = units
+                else:
+                    self.positions.pop(instrument, None)
+
+            if 'accountBalance' in transaction:
+                self.balance = float(transaction['accountBalance'])
+            elif kind == 'ORDER_FILL' and self.balance is not None:
+                self.balance += float(transaction.get('pl', 0)) + float(transaction.get('financing', 0)) \
+                    - float(transaction.get('commission', 0))
+
+    def stream_transactions(self, stream_url):
+        """Apply transactions from the transactions stream until stopped, reconnecting on errors."""
+        while not self._stop_event.is_set():
+            try:
+                connect_timeout = oanda_client.settings['timeout'][0]
+                response = oanda_client.get(stream_url, self.api_key, stream=True, timeout=(connect_timeout, 30))
+                if response.status_code != 200:
+                    print(f"Error connecting to transactions stream: {response.status_code}")
+                else:
+                    for line in response.iter_lines():
+                        if self._stop_event.is_set():
+                            return
+                        if not line:
+                            continue
+                        transaction = json.loads(line)
+                        if transaction.get('type') != 'HEARTBEAT':
+                            self.apply_transaction(transaction)
+            except (requests.RequestException, json.JSONDecodeError) as e:
+                print(f"Transactions stream error: {e}")
+            self._stop_event.wait(5)
+
+    def reconcile_every(self, interval):
+        """Re-seed from REST every `interval` seconds until stopped."""
+        while not self._stop_event.wait(interval):
+            try:
+                self.seed()
+            except requests.RequestException as e:
+                print(f"Error reconciling account state: {e}")
+            except Exception as e:
+                print(f"Unexpected error reconciling account state: {e}")
+                traceback.print_exc()
+
+    def start(self, stream_url=None, reconcile_interval=60):
+        """Start the transactions stream and reconcile timer on background threads."""
+        targets = [(self.reconcile_every, (reconcile_interval,))]
+        if stream_url:
+            targets.append((self.stream_transactions, (stream_url,)))
+        for target, args in targets:
+            thread = threading.Thread(target=target, args=args, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def get_transactions_stream_url(account_type, mock, account_id):
+    if mock:
+        return f"{oanda_client.MOCK_URL}/v3/accounts/{account_id}/transactions/stream"
+    host = "stream-fxpractice.oanda.com" if account_type == 'practice' else "stream-fxtrade.oanda.com"
+    return f"https://{host}/v3/accounts/{account_id}/transactions/stream"
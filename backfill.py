@@ -0,0 +1,133 @@
+import argparse
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import oanda_client
+from bar_aggregator import parse_timestamp
+from candle_file import CandleFile, candle_file_path
+
+GRANULARITY_SECONDS = {
+    'M1': 60, 'M2': 120, 'M4': 240, 'M5': 300, 'M10': 600, 'M15': 900, 'M30': 1800,
+    'H1': 3600, 'H2': 7200, 'H3': 10800, 'H4': 14400, 'H6': 21600, 'H8': 28800, 'H12': 43200,
+    'D': 86400,
+}
+# The most candles OANDA returns for one request
+MAX_CANDLES_PER_REQUEST = 5000
+PRICE_COMPONENTS = {'B': 'bid', 'M': 'mid', 'A': 'ask'}
+
+
+def format_time(epoch):
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000000000Z', time.gmtime(epoch))
+
+
+def split_windows(start, end, granularity='M1', max_count=MAX_CANDLES_PER_REQUEST):
+    """Split [start, end) into (from, to) epoch pairs of at most `max_count` candles each."""
+    seconds = GRANULARITY_SECONDS[granularity]
+    start -= start % seconds
+    step = max_count * seconds
+    return [(lo, min(lo + step, end)) for lo in range(start, end, step)]
+
+
+def parse_candles(candles, price='B'):
+    """Column arrays (CANDLE_RECORD layout) for the complete candles of a /candles response."""
+    component = PRICE_COMPONENTS[price]
+    complete = [candle for candle in candles if candle['complete']]
+    columns = {
+        'start_time': np.array([parse_timestamp(candle['time']) for candle in complete], dtype=np.int64),
+        'volume': np.array([candle['volume'] for candle in complete], dtype=np.int64),
+    }
+    for name in ('o', 'h', 'l', 'c'):
+        columns[name] = np.array([candle[component][name] for candle in complete], dtype=np.float64)
+    return columns
+
+
+def fetch_candles(api_key, instrument, granularity='M1', price='B', **params):
+    """One /candles request (`count`, or `from` and `to`); returns columns, or None on failure."""
+    params = dict(params, granularity=granularity, price=price)
+    response = oanda_client.get(f"/v3/instruments/{instrument}/candles", api_key, params=params)
+    if response.status_code != 200:
+        print(f"Failed to fetch candles for {instrument}: {response.status_code} - {response.text}")
+        return None
+    return parse_candles(response.json().get('candles', []), price)
+
+
+def fetch_window(api_key, instrument, granularity, window, price='B', open_ended=False):
+    """Candles of one (from, to) window; an `open_ended` window asks for `from` plus a count
+    instead, since OANDA rejects a `to` in the future and the local clock may run ahead."""
+    try:
+        if open_ended:
+            seconds = GRANULARITY_SECONDS[granularity]
+            count = min(MAX_CANDLES_PER_REQUEST, max(1, -(-(window[1] - window[0]) // seconds)))
+            params = {'from': format_time(window[0]), 'count': count}
+        else:
+            params = {'from': format_time(window[0]), 'to': format_time(window[1])}
+        return fetch_candles(api_key, instrument, granularity, price, **params)
+    except Exception as e:
+        print(f"Error fetching {instrument} candles from {format_time(window[0])}: {e}")
+        traceback.print_exc()
+        return None
+
+
+def backfill(api_key, instrument, candle_file, start, end=None, granularity='M1', workers=4, price='B'):
+    """Download the candles missing from `candle_file` and append them; returns how many were written.
+
+    Only the range after the file's last candle, however old, up to `end` (default
+    now) is requested; `start` is used only when the file is empty. The range is split
+    into API-sized windows fetched concurrently over the pooled connections. Windows are written in order and the backfill stops at
+    the first failed one, so the file never has a hole and the next run resumes there.
+    """
+    seconds = GRANULARITY_SECONDS[granularity]
+    up_to_now = end is None
+    end = int(time.time() if up_to_now else end)
+    if candle_file.last_start_time is not None:
+        # Resume right after the cache, however old it is; `start` only applies to an empty file
+        start = candle_file.last_start_time + seconds
+    windows = split_windows(int(start), end, granularity)
+    if not windows:
+        return 0
+    written = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(windows)))) as executor:
+        # Up to now, the newest window is requested without `to`
+        fetches = [executor.submit(fetch_window, api_key, instrument, granularity, window, price,
+                                   up_to_now and index == len(windows) - 1)
+                   for index, window in enumerate(windows)]
+        for future in fetches:
+            columns = future.result()
+            if columns is None:
+                for pending in fetches:
+                    pending.cancel()
+                break
+            if len(columns['c']):
+                written += candle_file.extend(columns)
+    return written
+
+
+def main():
+    from oanda_trading import get_config
+
+    parser = argparse.ArgumentParser(description="Backfill the local candle cache from OANDA")
+    parser.add_argument('instruments', help="Comma-separated instruments")
+    parser.add_argument('--granularity', default='M1', choices=list(GRANULARITY_SECONDS))
+    parser.add_argument('--days', type=float, default=30, help="History to fetch when the cache is empty")
+    parser.add_argument('--candle-dir', default='.', help="Directory of the binary candle files")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent requests per instrument")
+    parser.add_argument('--mock', action='store_true', help="Fetch from the mock server instead of OANDA API")
+    args = parser.parse_args()
+
+    account_id, access_token, account_type = get_config('pyalgo.cfg')
+    oanda_client.configure(base_url=oanda_client.get_api_url(account_type, args.mock),
+                           pool_size=max(args.workers, 1))
+    start = time.time() - args.days * 86400
+    for instrument in args.instruments.split(','):
+        candle_file = CandleFile(candle_file_path(args.candle_dir, instrument, args.granularity))
+        started = time.perf_counter()
+        written = backfill(access_token, instrument, candle_file, start, granularity=args.granularity,
+                           workers=args.workers)
+        print(f"{instrument} {args.granularity}: {written} new candles, {len(candle_file)} cached "
+              f"({time.perf_counter() - started:.2f}s)")
+        candle_file.close()
+
+
+if __name__ == "__main__":
+    main()
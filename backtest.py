@@ -0,0 +1,178 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from candle_file import CandleFile, CANDLE_RECORD
+from candle_store import to_epoch_seconds
+from indicators import batch_rsi
+from tick_recorder import read_tick_file, read_ticks, ticks_to_candles
+
+
+def load_candles(path, cache=True):
+    """Load candles as a dict of NumPy arrays from a CSV, Parquet or binary candle file.
+
+    CSV files (e.g. the mock server's oanda_data_*.csv) are converted once to a binary
+    candle file next to them, which later runs map with mmap instead of parsing.
+    Recorded ticks (a .ticks file, or an instrument's folder of them) are rolled up
+    into one-minute bid candles.
+    """
+    if path.endswith('.ticks'):
+        return ticks_to_candles(read_tick_file(path))
+    if os.path.isdir(path):
+        path = path.rstrip(os.sep)
+        return ticks_to_candles(read_ticks(os.path.dirname(path), os.path.basename(path)))
+    if path.endswith('.bin'):
+        records = CandleFile(path).read()
+        return {name: records[name] for name in CANDLE_RECORD.names}
+
+    cache_path = f"{os.path.splitext(path)[0]}.bin"
+    if cache and os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        return load_candles(cache_path)
+
+    df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+    if 'complete' in df:
+        df = df[df['complete'].astype(str) == 'True']
+    times = df['start_time'] if 'start_time' in df else df['time']
+    columns = {
+        'start_time': times.to_numpy() if pd.api.types.is_numeric_dtype(times) else to_epoch_seconds(times),
+        'o': df['o'].to_numpy(dtype=np.float64),
+        'h': df['h'].to_numpy(dtype=np.float64),
+        'l': df['l'].to_numpy(dtype=np.float64),
+        'c': df['c'].to_numpy(dtype=np.float64),
+        'volume': df['volume'].to_numpy(dtype=np.int64),
+    }
+    if cache:
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        candle_file = CandleFile(cache_path)
+        candle_file.extend(columns)
+        candle_file.close()
+    return columns
+
+
+def session_mask(start_time, timeframe=60, timezone='Europe/London', start_hour=6, end_hour=22):
+    """Vectorized should_trade(): weekdays, between start_hour and end_hour, at each bar's close."""
+    close_times = pd.to_datetime(np.asarray(start_time) + timeframe, unit='s', utc=True).tz_convert(timezone)
+    seconds = close_times.hour * 3600 + close_times.minute * 60 + close_times.second
+    in_hours = (seconds >= start_hour * 3600) & (seconds <= end_hour * 3600)
+    return np.asarray((close_times.weekday <= 4) & in_hours)
+
+
+def _first_exit(high, low, start, stop_loss, take_profit, direction):
+    """Index of the first bar from `start` that touches the stop loss or take profit.
+
+    Scans in doubling chunks so short trades only look at a few bars. Returns
+    (index, price); a bar touching both levels is assumed to hit the stop loss first.
+    """
+    n = len(high)
+    size = 64
+    while start < n:
+        end = min(start + size, n)
+        if direction > 0:
+            sl_hit = low[start:end] <= stop_loss
+            tp_hit = high[start:end] >= take_profit
+        else:
+            sl_hit = high[start:end] >= stop_loss
+            tp_hit = low[start:end] <= take_profit
+        hits = np.flatnonzero(sl_hit | tp_hit)
+        if len(hits):
+            i = hits[0]
+            return start + i, stop_loss if sl_hit[i] else take_profit
+        start = end
+        size *= 2
+    return None, None
+
+
+def backtest(candles, rsi_length=14, oversold=30, overbought=70, sl=25, tp=25, leverage=15,
+             initial_balance=100000.0, pip_value=0.0001, mask=None, rsi=None):
+    """Backtest the live RsiStrategy over closed candles.
+
+    Signals and the session filter are computed for every bar at once; the loop only
+    walks from one trade to the next. Like the live trader, a signal is taken at a
+    bar's close, only while flat, with a stop loss of `sl` pips and a take profit of
+    `tp` pips, sized at balance * leverage. Returns (report, trades DataFrame).
+    `mask` and `rsi` may be passed precomputed, e.g. by a parameter sweep.
+    """
+    start_time = np.asarray(candles['start_time'])
+    high = np.asarray(candles['h'])
+    low = np.asarray(candles['l'])
+    close = np.asarray(candles['c'])
+    n = len(close)
+    if rsi is None:
+        rsi = batch_rsi(close, rsi_length)
+    if mask is None:
+        mask = session_mask(start_time)
+
+    with np.errstate(invalid='ignore'):
+        signal = np.where(rsi < oversold, 1, np.where(rsi > overbought, -1, 0))
+    signal[~mask] = 0
+    entries = np.flatnonzero(signal)
+
+    trades = []
+    balance = initial_balance
+    bars_in_market = 0
+    k = 0
+    while k < len(entries) and entries[k] < n - 1:
+        entry = entries[k]
+        direction = signal[entry]
+        price = close[entry]
+        stop_loss = price - direction * sl * pip_value
+        take_profit = price + direction * tp * pip_value
+        units = int(balance * leverage)
+        exit_index, exit_price = _first_exit(high, low, entry + 1, stop_loss, take_profit, direction)
+        if exit_index is None:
+            exit_index, exit_price = n - 1, close[-1]
+        pnl = direction * units * (exit_price - price)
+        balance += pnl
+        bars_in_market += exit_index - entry
+        trades.append((start_time[entry], start_time[exit_index], direction, price, exit_price,
+                       units, direction * (exit_price - price) / pip_value, pnl, balance))
+        # Flat again at the close of the exit bar, where the live trader could re-enter
+        k = np.searchsorted(entries, exit_index)
+
+    trades = pd.DataFrame(trades, columns=['entry_time', 'exit_time', 'direction', 'entry_price', 'exit_price',
+                                           'units', 'pips', 'pnl', 'balance'])
+    equity = np.concatenate(([initial_balance], trades['balance'].to_numpy()))
+    peaks = np.maximum.accumulate(equity)
+    report = {
+        'bars': n,
+        'trades': len(trades),
+        'wins': int((trades['pnl'] > 0).sum()),
+        'pnl': balance - initial_balance,
+        'return_pct': 100.0 * (balance / initial_balance - 1),
+        'max_drawdown_pct': float(100.0 * np.max((peaks - equity) / peaks)),
+        'exposure_pct': 100.0 * bars_in_market / n if n else 0.0,
+        'final_balance': balance,
+    }
+    return report, trades
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the RSI strategy on historical candles")
+    parser.add_argument('path', help="Candle file (.csv, .parquet or .bin)")
+    parser.add_argument('--rsi-length', type=int, default=14)
+    parser.add_argument('--oversold', type=float, default=30)
+    parser.add_argument('--overbought', type=float, default=70)
+    parser.add_argument('--sl', type=float, default=25, help="Stop loss in pips")
+    parser.add_argument('--tp', type=float, default=25, help="Take profit in pips")
+    parser.add_argument('--leverage', type=float, default=15)
+    parser.add_argument('--trades', default=None, help="Write the trade list to this CSV file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    candles = load_candles(args.path)
+    loaded = time.perf_counter()
+    report, trades = backtest(candles, rsi_length=args.rsi_length, oversold=args.oversold,
+                              overbought=args.overbought, sl=args.sl, tp=args.tp, leverage=args.leverage)
+    finished = time.perf_counter()
+
+    for key, value in report.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    print(f"Loaded in {loaded - started:.3f}s, backtested in {finished - loaded:.3f}s")
+    if args.trades:
+        trades.to_csv(args.trades, index=False)
+
+
+if __name__ == "__main__":
+    main()
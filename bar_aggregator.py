@@ -0,0 +1,193 @@
+import calendar
+
+# Epoch of each 'YYYY-MM-DDTHH:MM' prefix already seen
+_minute_cache = {}
+
+
+def parse_timestamp(timestamp):
+    """Convert an OANDA timestamp to integer epoch seconds (UTC).
+
+    Handles RFC3339 ('2024-11-22T21:59:03.123456789Z') and UNIX ('1732312743.123456789')
+    formats. The minute prefix is parsed once and cached, so a tick costs a slice, a
+    dict lookup and one small int() call.
+    """
+    if timestamp[4] != '-':
+        return int(timestamp.split('.', 1)[0])
+    prefix = timestamp[:16]
+    minute = _minute_cache.get(prefix)
+    if minute is None:
+        if len(_minute_cache) > 10000:
+            _minute_cache.clear()
+        minute = calendar.timegm((int(prefix[0:4]), int(prefix[5:7]), int(prefix[8:10]),
+                                  int(prefix[11:13]), int(prefix[14:16]), 0))
+        _minute_cache[prefix] = minute
+    return minute + int(timestamp[17:19])
+
+
+class BarAggregator:
+    """Builds OHLC bars on event time using integer epoch buckets.
+
+    A bar covering [start, start + timeframe) closes when a tick or heartbeat at or
+    after its end arrives, so replaying data faster than real time gives the same
+    bars. Windows without ticks are either filled with flat zero-volume bars or
+    skipped. The first window is usually joined part-way through, so it is dropped
+    by default.
+    """
+
+    def __init__(self, timeframe=60, fill_empty=True, drop_first=True):
+        self.timeframe = timeframe
+        self.fill_empty = fill_empty
+        self.drop_first = drop_first
+        self.bar = None  # [start, o, h, l, c, volume]
+        self.last_close = None
+        self.next_start = None  # First window not yet closed once a bar has closed
+
+    def reset(self):
+        """Forget the open bar after a break in the data, e.g. a stream reconnect.
+
+        The next window is joined part-way through, so it is dropped like the first one.
+        """
+        self.bar = None
+        self.next_start = None
+        self.drop_first = True
+
+    def update(self, epoch, price, volume=1):
+        """Add a tick; returns the bars it closed as (start, o, h, l, c, volume) tuples."""
+        bucket = epoch - epoch % self.timeframe
+        bar = self.bar
+        if bar is not None and bucket <= bar[0]:
+            # Same window (late ticks are folded into the open bar)
+            if price > bar[2]:
+                bar[2] = price
+            elif price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+            bar[5] += volume
+            return ()
+        if self.next_start is not None and bucket < self.next_start:
+            bucket = self.next_start  # Late tick for a window already closed by a heartbeat
+        closed = self._close_until(bucket)
+        self.bar = [bucket, price, price, price, price, volume]
+        return closed
+
+    def advance(self, epoch):
+        """Close the open bar (and fill gaps) once event time reaches `epoch`, e.g. on a heartbeat.
+
+        No bar is opened: the window `epoch` falls in gets its open, high and low from
+        its first tick, or a flat bar once a later event shows it had none.
+        """
+        bucket = epoch - epoch % self.timeframe
+        if self.bar is not None and bucket <= self.bar[0]:
+            return ()
+        return self._close_until(bucket)
+
+    def _close_until(self, bucket):
+        """Close the open bar and fill the empty windows before `bucket`."""
+        closed = []
+        bar = self.bar
+        if bar is not None:
+            if self.drop_first:
+                self.drop_first = False
+            else:
+                closed.append(tuple(bar))
+            self.last_close = bar[4]
+            self.next_start = bar[0] + self.timeframe
+            self.bar = None
+        if self.next_start is None:
+            return closed
+        if self.fill_empty:
+            close = self.last_close
+            for start in range(self.next_start, bucket, self.timeframe):
+                closed.append((start, close, close, close, close, 0))
+        self.next_start = max(self.next_start, bucket)
+        return closed
+
+
+class BarRollup:
+    """Builds higher-timeframe bars from closed lower-timeframe bars.
+
+    Each closed bar is folded into the open bar in O(1), and the open bar closes as
+    soon as the last lower bar of its window arrives, or a later bar does. Empty
+    windows are filled with flat zero-volume bars, and a first window joined
+    part-way through is dropped, as in BarAggregator.
+    """
+
+    def __init__(self, timeframe, source_timeframe=60, fill_empty=True):
+        if timeframe % source_timeframe:
+            raise ValueError(f"Timeframe {timeframe}s is not a multiple of {source_timeframe}s")
+        self.timeframe = timeframe
+        self.source_timeframe = source_timeframe
+        self.fill_empty = fill_empty
+        self.bar = None  # [start, o, h, l, c, volume]
+        self.skip = False
+        self.next_start = None
+        self.last_close = None
+
+    def update(self, bar):
+        """Add a closed lower-timeframe bar; returns the higher-timeframe bars it closed."""
+        start = bar[0]
+        bucket = start - start % self.timeframe
+        closed = []
+        current = self.bar
+        if current is not None and bucket > current[0]:
+            self._close(closed)
+            current = None
+        if current is None:
+            if self.next_start is None:
+                self.skip = start != bucket
+            elif self.fill_empty:
+                close = self.last_close
+                for gap in range(self.next_start, bucket, self.timeframe):
+                    closed.append((gap, close, close, close, close, 0))
+            self.bar = [bucket, bar[1], bar[2], bar[3], bar[4], bar[5]]
+        else:
+            if bar[2] > current[2]:
+                current[2] = bar[2]
+            if bar[3] < current[3]:
+                current[3] = bar[3]
+            current[4] = bar[4]
+            current[5] += bar[5]
+        if start + self.source_timeframe >= bucket + self.timeframe:
+            self._close(closed)
+        return closed
+
+    def resume(self, open_bar=None, last_start=None, last_close=None):
+        """Continue after history: `open_bar` is the unfinished window, if any, and
+        `last_start`/`last_close` describe the last complete bar."""
+        self.bar = list(open_bar) if open_bar is not None else None
+        self.skip = False
+        self.next_start = None if last_start is None else last_start + self.timeframe
+        self.last_close = last_close
+
+    def _close(self, closed):
+        bar = self.bar
+        if self.skip:
+            self.skip = False
+        else:
+            closed.append(tuple(bar))
+        self.last_close = bar[4]
+        self.next_start = bar[0] + self.timeframe
+        self.bar = None
+
+
+def roll_up(columns, timeframe):
+    """Aggregate candle columns (start_time, o, h, l, c, volume) into `timeframe`-second buckets.
+
+    Returns the same columns for the higher timeframe; the last bucket may be incomplete.
+    """
+    import numpy as np
+
+    epochs = np.asarray(columns['start_time'])
+    if not len(epochs):
+        return {name: np.asarray(columns[name])[:0] for name in ('start_time', 'o', 'h', 'l', 'c', 'volume')}
+    buckets = epochs - epochs % timeframe
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(epochs)] - 1
+    return {
+        'start_time': buckets[starts],
+        'o': np.asarray(columns['o'])[starts],
+        'h': np.maximum.reduceat(np.asarray(columns['h']), starts),
+        'l': np.minimum.reduceat(np.asarray(columns['l']), starts),
+        'c': np.asarray(columns['c'])[ends],
+        'volume': np.add.reduceat(np.asarray(columns['volume']), starts),
+    }
@@ -0,0 +1,338 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import requests
+import oanda_client
+import oanda_trading
+from account_state import AccountState
+from candle_file import CandleFile
+from execution import OrderGateway
+from instrument_state import InstrumentState
+import stream_decoder
+from stream_decoder import DECODERS, FastStreamDecoder
+from strategies import RsiStrategy, StrategyEngine
+from synthetic_ticks import SyntheticTickSource
+
+MOCK_ACCOUNT_ID = "001-001-1234567-001"
+START_EPOCH = 1_700_000_040  # A Tuesday, 22:14 UTC, on a whole minute
+
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1e6
+    return {
+        'count': len(samples),
+        'p50_us': float(np.percentile(samples, 50)),
+        'p90_us': float(np.percentile(samples, 90)),
+        'p99_us': float(np.percentile(samples, 99)),
+        'max_us': float(samples.max()),
+    }
+
+
+def synthetic_lines(count, instruments=('EUR_USD',), rate=100.0, seed=1):
+    """Encoded pricing-stream lines for `count` reproducible synthetic ticks."""
+    ticks = SyntheticTickSource(instruments, rate=rate, seed=seed).generate(count, START_EPOCH)
+    return [json.dumps(tick, separators=(',', ':')).encode('utf-8') for tick in ticks]
+
+
+@contextlib.contextmanager
+def trading_harness(instruments, handler=None):
+    """Fresh trader state with a stubbed session filter and an order gateway running `handler`."""
+    saved = (oanda_trading.should_trade, oanda_trading.account_state, oanda_trading.order_gateway,
+             oanda_trading.strategy_engine)
+    oanda_trading.instruments.clear()
+    oanda_trading.strategy_engine = StrategyEngine()
+    for name in instruments:
+        oanda_trading.strategy_engine.register(name, RsiStrategy())
+        oanda_trading.instruments[name] = InstrumentState(name)
+    oanda_trading.should_trade = lambda: True
+    oanda_trading.account_state = AccountState()
+    oanda_trading.account_state.balance = 100000.0
+    oanda_trading.order_gateway = OrderGateway(handler or (lambda intent: None)).start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield oanda_trading.instruments
+    finally:
+        oanda_trading.order_gateway.stop()
+        (oanda_trading.should_trade, oanda_trading.account_state, oanda_trading.order_gateway,
+         oanda_trading.strategy_engine) = saved
+        oanda_trading.instruments.clear()
+
+
+def stream_chunks(lines, size=65536):
+    """The lines as a newline-delimited byte stream cut into socket-sized chunks."""
+    stream = b"\n".join(lines) + b"\n"
+    return [stream[i:i + size] for i in range(0, len(stream), size)]
+
+
+def bench_tick_parse(count):
+    """Per-line cost of decoding, parsing and processing pricing-stream lines in process."""
+    lines = synthetic_lines(count, instruments=('EUR_USD', 'GBP_USD', 'USD_JPY'))
+    started = time.perf_counter()
+    for line in lines:
+        json.loads(line.decode('utf-8'))
+    parse_seconds = time.perf_counter() - started
+
+    with trading_harness(['EUR_USD', 'GBP_USD', 'USD_JPY']):
+        started = time.perf_counter()
+        for line in lines:
+            oanda_trading.process_forex_data("bench", "bench", json.loads(line.decode('utf-8')))
+        process_seconds = time.perf_counter() - started
+    with trading_harness(['EUR_USD', 'GBP_USD', 'USD_JPY']):
+        decoder = FastStreamDecoder()
+        started = time.perf_counter()
+        for chunk in stream_chunks(lines):
+            for message in decoder.feed(chunk):
+                oanda_trading.process_message("bench", "bench", message)
+        fast_process_seconds = time.perf_counter() - started
+    return {
+        'ticks': count,
+        'parse_ticks_per_s': count / parse_seconds,
+        'process_ticks_per_s': count / process_seconds,
+        'fast_process_ticks_per_s': count / fast_process_seconds,
+    }
+
+
+def bench_decoders(count, repeat=3):
+    """Per-tick cost of turning raw stream bytes into (instrument, time, bid) for each decoder.
+
+    `iter_lines_json` is the previous path: split lines, decode to str, json.loads and
+    read the top bid from the dicts. The decoders work on the raw chunks, with the
+    standard json module and, when installed, orjson. Best of `repeat` runs.
+    """
+    instruments = ('EUR_USD', 'GBP_USD', 'USD_JPY')
+    chunks = stream_chunks(synthetic_lines(count, instruments=instruments))
+
+    def iter_lines_json():
+        for line in b"".join(chunks).splitlines():
+            if line:
+                data = json.loads(line.decode('utf-8'))
+                if data.get('type') == 'PRICE' and data['instrument'] in instruments:
+                    float(data['bids'][0]['price'])
+
+    def decode_with(decoder_class, loads):
+        def run():
+            decoder = decoder_class(loads=loads)
+            for chunk in chunks:
+                decoder.feed(chunk)
+        return run
+
+    paths = {'iter_lines_json': iter_lines_json}
+    for name, decoder_class in DECODERS.items():
+        paths[f"{name}_json"] = decode_with(decoder_class, json.loads)
+        if stream_decoder.orjson is not None:
+            paths[f"{name}_orjson"] = decode_with(decoder_class, stream_decoder.orjson.loads)
+    results = {}
+    for name, run in paths.items():
+        best = min(timed_run(run) for _ in range(repeat))
+        results[name] = {'us_per_tick': best / count * 1e6, 'ticks_per_s': count / best}
+    return results
+
+
+def timed_run(run):
+    started = time.perf_counter()
+    run()
+    return time.perf_counter() - started
+
+
+def prefill(state, size, rising=False):
+    """Load `size` historical one-minute candles ending before START_EPOCH and seed indicators."""
+    rng = np.random.default_rng(size)
+    if rising:
+        closes = 1.08 + 0.0001 * np.arange(size)
+    else:
+        closes = 1.08 + np.cumsum(rng.normal(0, 0.0002, size))
+    state.candles.extend({
+        'start_time': START_EPOCH - 60 * np.arange(size, 0, -1),
+        'o': closes, 'h': closes + 0.0002, 'l': closes - 0.0002, 'c': closes,
+        'volume': np.full(size, 50),
+    })
+    oanda_trading.seed_indicators(state)
+
+
+def bench_bar_close(sizes, bars):
+    """Cost of closing a bar (store, persist, indicators, decision) as history grows."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            with trading_harness(['EUR_USD']) as instruments:
+                state = instruments['EUR_USD']
+                prefill(state, size)
+                state.candle_file = CandleFile(os.path.join(directory, f"bench_{size}.bin"))
+                samples = []
+                for i in range(bars):
+                    price = 1.08 + 0.0001 * np.sin(i)
+                    bar = (START_EPOCH + 60 * i, price, price + 0.0002, price - 0.0002, price, 50)
+                    started = time.perf_counter()
+                    oanda_trading.close_bar("bench", "bench", state, bar)
+                    samples.append(time.perf_counter() - started)
+                state.close()
+            results[str(size)] = percentiles(samples)
+    return results
+
+
+def write_mock_csv(path, rows=2000):
+    """A small recorded-format candle CSV so the mock server can price and fill orders."""
+    rng = np.random.default_rng(0)
+    closes = 1.08 + np.cumsum(rng.normal(0, 0.0002, rows))
+    times = pd.to_datetime(START_EPOCH + 60 * np.arange(rows), unit='s', utc=True)
+    pd.DataFrame({
+        'time': times.strftime('%Y-%m-%dT%H:%M:%S.000000000Z'),
+        'o': closes, 'h': closes + 0.0002, 'l': closes - 0.0002, 'c': closes,
+        'volume': 50, 'complete': True,
+    }).to_csv(path, index=False)
+
+
+@contextlib.contextmanager
+def mock_server(port):
+    """Run mock_server_oanda.py on a local port with a generated CSV."""
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'candles.csv')
+        write_mock_csv(csv_path)
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_server_oanda.py')
+        server = subprocess.Popen([sys.executable, script, '--csv', csv_path, '--port', str(port), '--no-debug'],
+                                  cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        url = f"http://localhost:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    requests.get(f"{url}/v3/accounts/{MOCK_ACCOUNT_ID}/summary", timeout=1)
+                    break
+                except requests.RequestException:
+                    time.sleep(0.1)
+            yield url
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def bench_tick_to_order(url, orders):
+    """Latency from receiving the bar-closing tick to the order fill response from the mock server."""
+    oanda_client.configure(base_url=url)
+    tick_started = {}
+    latencies = []
+
+    def handler(intent):
+        oanda_trading.execute_trade_intent("bench", MOCK_ACCOUNT_ID, intent)
+        latencies.append(time.perf_counter() - tick_started['at'])
+        # Flatten so the next bar can trade again
+        oanda_trading.account_state.positions.clear()
+
+    with trading_harness(['EUR_USD'], handler) as instruments:
+        state = instruments['EUR_USD']
+        # Steadily rising closes keep RSI at 100, so every bar close is a sell signal
+        prefill(state, 100, rising=True)
+        price = 1.2
+        # The first window is dropped as partial, so orders + 2 ticks close `orders` bars
+        for i in range(orders + 2):
+            price += 0.0001
+            tick = {'type': 'PRICE', 'instrument': 'EUR_USD', 'time': f"{START_EPOCH + 60 * i}.000000000",
+                    'bids': [{'price': f"{price:.5f}"}]}
+            tick_started['at'] = time.perf_counter()
+            oanda_trading.process_forex_data("bench", MOCK_ACCOUNT_ID, tick)
+            oanda_trading.order_gateway.queue.join()
+    return percentiles(latencies) if latencies else {'count': 0}
+
+
+def bench_stream(url, seconds):
+    """Ticks per second stream_forex_data consumes from the mock server's synthetic stream."""
+    count = [0]
+    process = oanda_trading.process_message
+
+    def counted(api_key, account_id, message):
+        count[0] += 1
+        process(api_key, account_id, message)
+
+    instruments = ['EUR_USD', 'GBP_USD', 'USD_JPY']
+    with trading_harness(instruments):
+        oanda_trading.process_message = counted
+        try:
+            started = time.perf_counter()
+            oanda_trading.stream_forex_data("bench", "bench",
+                                            f"{url}/stream?source=synthetic&rate=1000000&duration={seconds}&seed=1",
+                                            "mock")
+            elapsed = time.perf_counter() - started
+        finally:
+            oanda_trading.process_message = process
+    return {'ticks': count[0], 'ticks_per_s': count[0] / elapsed}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(previous, current):
+    """Print each metric next to a previous run's value."""
+    old = flatten(previous['results'])
+    new = flatten(current['results'])
+    for key in sorted(new):
+        if key in old and old[key]:
+            print(f"{key:45} {old[key]:14.1f} {new[key]:14.1f} {new[key] / old[key]:7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tick-to-order pipeline against the local mock server")
+    parser.add_argument('--ticks', type=int, default=50000, help="Ticks for the parse benchmark")
+    parser.add_argument('--sizes', default="100,10000,1000000", help="History sizes for the bar-close benchmark")
+    parser.add_argument('--bars', type=int, default=200, help="Bars closed per history size")
+    parser.add_argument('--orders', type=int, default=100, help="Orders for the tick-to-order benchmark")
+    parser.add_argument('--stream-seconds', type=float, default=5)
+    parser.add_argument('--port', type=int, default=5055, help="Port for the mock server")
+    parser.add_argument('--output', default="bench_results.json")
+    parser.add_argument('--compare', default=None, help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    results = {}
+    print("Tick parse...")
+    results['tick_parse'] = bench_tick_parse(args.ticks)
+    print("Stream decoders...")
+    results['decoders'] = bench_decoders(args.ticks)
+    print("Bar close...")
+    results['bar_close'] = bench_bar_close([int(size) for size in args.sizes.split(',')], args.bars)
+    with mock_server(args.port) as url:
+        print("Tick to order...")
+        results['tick_to_order'] = bench_tick_to_order(url, args.orders)
+        print("Stream...")
+        results['stream'] = bench_stream(url, args.stream_seconds)
+
+    report = {'environment': environment(), 'results': results}
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), report)
+
+
+if __name__ == "__main__":
+    main()
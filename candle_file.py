@@ -0,0 +1,132 @@
+import os
+import threading
+import traceback
+import numpy as np
+
+# One fixed-width little-endian record per closed candle (48 bytes)
+CANDLE_RECORD = np.dtype([
+    ('start_time', '<i8'),
+    ('o', '<f8'),
+    ('h', '<f8'),
+    ('l', '<f8'),
+    ('c', '<f8'),
+    ('volume', '<i8'),
+])
+
+
+def candle_file_path(directory, instrument, granularity='M1'):
+    """Path of the candle file for one instrument and granularity."""
+    return os.path.join(directory, f"{instrument}_{granularity}.bin")
+
+
+class CandleFile:
+    """Append-only binary file of closed candles.
+
+    Each append writes a single record, so disk I/O per bar is constant. Reopening
+    maps the file with mmap instead of parsing it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._repair()
+        self._file = open(path, 'ab')
+        self.last_start_time = None
+        records = self.read()
+        if len(records):
+            self.last_start_time = int(records['start_time'][-1])
+
+    def _repair(self):
+        """Drop a partially written trailing record left by a crash."""
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        extra = size % CANDLE_RECORD.itemsize
+        if extra:
+            with open(self.path, 'r+b') as file:
+                file.truncate(size - extra)
+
+    def __len__(self):
+        return os.path.getsize(self.path) // CANDLE_RECORD.itemsize
+
+    def append(self, start_time, o, h, l, c, volume):
+        """Append one closed candle and flush it to the OS."""
+        record = np.array([(start_time, o, h, l, c, volume)], dtype=CANDLE_RECORD)
+        with self._lock:
+            self._file.write(record.tobytes())
+            self._file.flush()
+            self.last_start_time = int(start_time)
+
+    def extend(self, columns):
+        """Append the candles newer than the last stored one; returns how many were written."""
+        start_times = np.asarray(columns['start_time'], dtype=np.int64)
+        if self.last_start_time is None:
+            keep = np.ones(len(start_times), dtype=bool)
+        else:
+            keep = start_times > self.last_start_time
+        records = np.zeros(int(np.count_nonzero(keep)), dtype=CANDLE_RECORD)
+        if not len(records):
+            return 0
+        for name in CANDLE_RECORD.names:
+            records[name] = np.asarray(columns[name])[keep]
+        with self._lock:
+            self._file.write(records.tobytes())
+            self._file.flush()
+            self.last_start_time = int(records['start_time'][-1])
+        return len(records)
+
+    def read(self):
+        """Memory-map the stored candles as a read-only structured array."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < CANDLE_RECORD.itemsize:
+            return np.zeros(0, dtype=CANDLE_RECORD)
+        return np.memmap(self.path, dtype=CANDLE_RECORD, mode='r', shape=(len(self),))
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.read())
+
+    def export(self, path):
+        """Write the stored candles to CSV or Parquet, chosen by file extension."""
+        df = self.to_frame()
+        tmp_path = f"{path}.tmp"
+        if path.endswith('.parquet'):
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PeriodicExporter(threading.Thread):
+    """Background thread that exports a CandleFile every `interval` seconds."""
+
+    def __init__(self, candle_file, path, interval=300):
+        super().__init__(daemon=True)
+        self.candle_file = candle_file
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._exported = None
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.export()
+
+    def export(self):
+        count = len(self.candle_file)
+        if count == self._exported:
+            return
+        try:
+            self.candle_file.export(self.path)
+            self._exported = count
+        except Exception as e:
+            print(f"Error exporting candles to {self.path}: {e}")
+            traceback.print_exc()
+
+    def stop(self):
+        self._stop_event.set()
+        self.export()
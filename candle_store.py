@@ -0,0 +1,146 @@
+import numpy as np
+
+CANDLE_COLUMNS = {
+    'start_time': np.int64,  # Epoch seconds (UTC)
+    'o': np.float64,
+    'h': np.float64,
+    'l': np.float64,
+    'c': np.float64,
+    'volume': np.int64,
+}
+
+
+def to_epoch_seconds(times):
+    """Convert timestamp strings (e.g. OANDA RFC3339) to int64 epoch seconds."""
+    import pandas as pd
+
+    elapsed = pd.to_datetime(pd.Series(times), utc=True) - pd.Timestamp(0, tz='UTC')
+    return (elapsed // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+
+
+class CandleStore:
+    """Columnar candle history backed by preallocated NumPy arrays.
+
+    Appends are amortized O(1): unbounded stores double their capacity when full,
+    while a store created with `maxlen` acts as a ring buffer that keeps the most
+    recent `maxlen` candles. Rows are always contiguous, so `column` and `to_frame`
+    return views instead of copies.
+    """
+
+    def __init__(self, capacity=2048, maxlen=None, extra_columns=()):
+        self.maxlen = maxlen
+        if maxlen is not None:
+            # Twice the window, so wrapping is one block copy every `maxlen` appends
+            capacity = 2 * maxlen
+        self.dtypes = dict(CANDLE_COLUMNS)
+        for name in extra_columns:
+            self.dtypes[name] = np.float64
+        self.arrays = {name: self._allocate(dtype, capacity) for name, dtype in self.dtypes.items()}
+        self.start = 0
+        self.end = 0
+
+    @staticmethod
+    def _allocate(dtype, capacity):
+        if np.issubdtype(dtype, np.floating):
+            return np.full(capacity, np.nan, dtype=dtype)
+        return np.zeros(capacity, dtype=dtype)
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def empty(self):
+        return self.end == self.start
+
+    @property
+    def capacity(self):
+        return len(self.arrays['c'])
+
+    def _make_room(self, rows):
+        """Ensure `rows` more candles fit after the current end."""
+        if self.end + rows <= self.capacity:
+            return
+        size = len(self)
+        if self.maxlen is None:
+            capacity = max(2 * self.capacity, size + rows)
+            for name, array in self.arrays.items():
+                grown = self._allocate(array.dtype, capacity)
+                grown[:size] = array[self.start:self.end]
+                self.arrays[name] = grown
+            self.start, self.end = 0, size
+        else:
+            # Slide the newest candles back to the front of the buffer
+            keep = min(size, max(self.maxlen - rows, 0))
+            for array in self.arrays.values():
+                array[:keep] = array[self.end - keep:self.end]
+                if np.issubdtype(array.dtype, np.floating):
+                    array[keep:] = np.nan
+            self.start, self.end = 0, keep
+
+    def append(self, start_time, o, h, l, c, volume, **extra):
+        """Append one closed candle."""
+        self._make_room(1)
+        i = self.end
+        arrays = self.arrays
+        arrays['start_time'][i] = start_time
+        arrays['o'][i] = o
+        arrays['h'][i] = h
+        arrays['l'][i] = l
+        arrays['c'][i] = c
+        arrays['volume'][i] = volume
+        for name, value in extra.items():
+            arrays[name][i] = np.nan if value is None else value
+        self.end += 1
+        if self.maxlen is not None and len(self) > self.maxlen:
+            self.start += 1
+
+    def extend(self, columns):
+        """Append many candles at once from a mapping of column name to values."""
+        rows = len(columns['c'])
+        if self.maxlen is not None and rows > self.maxlen:
+            columns = {name: np.asarray(values)[-self.maxlen:] for name, values in columns.items()}
+            rows = self.maxlen
+        self._make_room(rows)
+        for name, values in columns.items():
+            self.arrays[name][self.end:self.end + rows] = values
+        self.end += rows
+        if self.maxlen is not None and len(self) > self.maxlen:
+            self.start = self.end - self.maxlen
+
+    def extend_frame(self, df):
+        """Append candles from a DataFrame such as the one get_historical_data returns.
+
+        Rows that are not newer than the last stored candle are skipped.
+        """
+        if df.empty:
+            return 0
+        columns = {name: df[name].to_numpy() for name in self.dtypes if name in df}
+        if not np.issubdtype(columns['start_time'].dtype, np.number):
+            columns['start_time'] = to_epoch_seconds(columns['start_time'])
+        if not self.empty:
+            newer = columns['start_time'] > self.last('start_time')
+            columns = {name: values[newer] for name, values in columns.items()}
+        rows = len(columns['c'])
+        if rows:
+            self.extend(columns)
+        return rows
+
+    def set_last(self, **values):
+        """Set extra column values (e.g. indicators) on the newest candle."""
+        i = self.end - 1
+        for name, value in values.items():
+            self.arrays[name][i] = np.nan if value is None else value
+
+    def last(self, name):
+        return self.arrays[name][self.end - 1]
+
+    def column(self, name):
+        """Zero-copy view of one column in chronological order."""
+        return self.arrays[name][self.start:self.end]
+
+    def to_frame(self, columns=None):
+        """DataFrame whose columns are views on the store (valid until the next append)."""
+        import pandas as pd
+
+        names = columns or list(self.dtypes)
+        return pd.DataFrame({name: self.column(name) for name in names}, copy=False)
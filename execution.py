@@ -0,0 +1,111 @@
+import queue
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+TradeIntent = namedtuple('TradeIntent', ['instrument', 'side', 'units', 'value', 'sl', 'tp', 'created', 'strategy'])
+
+
+def make_intent(instrument, side, units, value, sl, tp, strategy=None):
+    """`value` is the indicator reading behind the signal of `strategy`."""
+    return TradeIntent(instrument, side, units, value, sl, tp, time.perf_counter(), strategy)
+
+
+class LatencyStats:
+    """Count, mean and max of a duration, safe to update from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def summary(self):
+        with self._lock:
+            mean = self.total / self.count if self.count else 0.0
+            return {'count': self.count, 'mean_us': mean * 1e6, 'max_us': self.max * 1e6}
+
+
+class OrderGateway:
+    """Executes trade intents on worker threads so the stream loop never blocks on REST calls.
+
+    The stream thread only pays for `submit`, a non-blocking queue put whose cost is
+    tracked in `submit_latency`; that is the bound on tick latency a trade decision adds.
+    Only one intent per instrument is in flight at a time.
+    """
+
+    def __init__(self, handler, workers=1, maxsize=1000):
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.pending = set()
+        self._pending_lock = threading.Lock()
+        self.submit_latency = LatencyStats()
+        self.queue_wait = LatencyStats()
+        self.execution_time = LatencyStats()
+        self.dropped = 0
+        self.threads = [threading.Thread(target=self._run, daemon=True, name=f"order-gateway-{i}")
+                        for i in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def submit(self, intent):
+        """Queue an intent without blocking; returns False if it was dropped."""
+        start = time.perf_counter()
+        accepted = False
+        with self._pending_lock:
+            if intent.instrument not in self.pending:
+                try:
+                    self.queue.put_nowait(intent)
+                    self.pending.add(intent.instrument)
+                    accepted = True
+                except queue.Full:
+                    print(f"Order queue full, dropping {intent.side} intent for {intent.instrument}")
+        if not accepted:
+            self.dropped += 1
+        self.submit_latency.add(time.perf_counter() - start)
+        return accepted
+
+    def _run(self):
+        while True:
+            intent = self.queue.get()
+            if intent is None:
+                self.queue.task_done()
+                return
+            started = time.perf_counter()
+            self.queue_wait.add(started - intent.created)
+            try:
+                self.handler(intent)
+            except Exception as e:
+                print(f"Error executing {intent.side} intent for {intent.instrument}: {e}")
+                traceback.print_exc()
+            finally:
+                self.execution_time.add(time.perf_counter() - started)
+                with self._pending_lock:
+                    self.pending.discard(intent.instrument)
+                self.queue.task_done()
+
+    def stop(self, timeout=5):
+        """Let queued intents finish, then stop the workers."""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def summary(self):
+        return {
+            'submit': self.submit_latency.summary(),
+            'queue_wait': self.queue_wait.summary(),
+            'execution': self.execution_time.summary(),
+            'dropped': self.dropped,
+        }
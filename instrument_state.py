@@ -0,0 +1,129 @@
+import math
+from indicators import IndicatorGraph, DEFAULT_INDICATORS
+from candle_store import CandleStore
+from bar_aggregator import BarAggregator, BarRollup, roll_up
+from backfill import GRANULARITY_SECONDS
+
+OHLC_COLUMNS = ('start_time', 'o', 'h', 'l', 'c', 'volume')
+
+
+def indicators_match(candles, indicators):
+    """Whether the newest candle's indicator columns hold the graph's latest values."""
+    if candles.empty:
+        return True
+    for column, value in indicators.latest().items():
+        stored = candles.last(column)
+        if value is None:
+            if not math.isnan(stored):
+                return False
+        elif stored != value and not (math.isnan(stored) and math.isnan(value)):
+            return False
+    return True
+
+
+class TimeframeState:
+    """Candles and indicators for one higher timeframe, rolled up from the base bars."""
+
+    def __init__(self, instrument, granularity, base_timeframe=60, maxlen=None, indicators=DEFAULT_INDICATORS):
+        self.instrument = instrument
+        self.granularity = granularity
+        self.timeframe = GRANULARITY_SECONDS[granularity]
+        self.rollup = BarRollup(self.timeframe, base_timeframe)
+        self.indicators = IndicatorGraph(indicators)
+        self.candles = CandleStore(maxlen=maxlen, extra_columns=self.indicators.columns.values())
+
+
+class InstrumentState:
+    """Everything the live trader keeps for one instrument.
+
+    The bar aggregator, candle history, indicator state and on-disk candle file
+    live together so a tick is routed with a single dict lookup. Higher
+    `timeframes` (e.g. 'M5', 'H1') are rolled up from the closed base bars.
+
+    `indicators` maps a granularity to the indicator keys computed on it (see
+    StrategyEngine.required_indicators); by default every timeframe gets
+    DEFAULT_INDICATORS.
+    """
+
+    def __init__(self, instrument, timeframe=60, maxlen=None, candle_file=None, timeframes=(), indicators=None):
+        self.instrument = instrument
+        self.granularity = next(name for name, seconds in GRANULARITY_SECONDS.items() if seconds == timeframe)
+        self.aggregator = BarAggregator(timeframe)
+        if indicators is None:
+            indicators = {granularity: DEFAULT_INDICATORS for granularity in (self.granularity, *timeframes)}
+        self.indicators = IndicatorGraph(indicators.get(self.granularity, ()))
+        self.candles = CandleStore(maxlen=maxlen, extra_columns=self.indicators.columns.values())
+        self.candle_file = candle_file
+        self.exporter = None
+        self.maxlen = maxlen
+        self.timeframes = {}
+        for granularity in sorted({*timeframes, *indicators}, key=GRANULARITY_SECONDS.get):
+            if GRANULARITY_SECONDS[granularity] > timeframe:
+                self.timeframes[granularity] = TimeframeState(instrument, granularity, timeframe, maxlen,
+                                                              indicators.get(granularity, ()))
+
+    def roll_up(self, bar):
+        """Feed a closed base bar to every higher timeframe; returns (TimeframeState, bar) pairs it closed."""
+        closed = []
+        for state in self.timeframes.values():
+            for higher in state.rollup.update(bar):
+                closed.append((state, higher))
+        return closed
+
+    def rebuild_timeframes(self):
+        """Roll the stored base candles up into every higher timeframe.
+
+        An unfinished last window stays open in the rollup, so live bars complete it.
+        """
+        base = {name: self.candles.column(name) for name in OHLC_COLUMNS}
+        starts = base['start_time']
+        for granularity, state in self.timeframes.items():
+            fresh = TimeframeState(self.instrument, granularity, self.aggregator.timeframe, self.maxlen,
+                                   state.indicators.keys())
+            rolled = roll_up(base, fresh.timeframe)
+            if len(starts) and starts[0] % fresh.timeframe:
+                rolled = {name: values[1:] for name, values in rolled.items()}  # Joined part-way through
+            open_bar = None
+            if len(rolled['start_time']) and starts[-1] + self.aggregator.timeframe < rolled['start_time'][-1] + fresh.timeframe:
+                open_bar = [rolled[name][-1].item() for name in OHLC_COLUMNS]
+                rolled = {name: values[:-1] for name, values in rolled.items()}
+            if len(rolled['start_time']):
+                fresh.candles.extend(rolled)
+                fresh.rollup.resume(open_bar, int(rolled['start_time'][-1]), float(rolled['c'][-1]))
+            elif open_bar is not None:
+                fresh.rollup.resume(open_bar)
+            self.timeframes[granularity] = fresh
+
+    def snapshot(self):
+        """Candles, indicator graphs and rollups of every timeframe, for a warm start."""
+        return {
+            'granularity': self.granularity,
+            'maxlen': self.maxlen,
+            'candles': self.candles,
+            'indicators': self.indicators,
+            'timeframes': self.timeframes,
+        }
+
+    def restore(self, snapshot):
+        """Adopt a snapshot taken with the same timeframes and indicators; returns whether it was used."""
+        timeframes = snapshot['timeframes']
+        if (snapshot['granularity'] != self.granularity or snapshot['maxlen'] != self.maxlen
+                or snapshot['indicators'].keys() != self.indicators.keys()
+                or list(timeframes) != list(self.timeframes)
+                or any(timeframes[name].indicators.keys() != state.indicators.keys()
+                       for name, state in self.timeframes.items())):
+            return False
+        # A snapshot taken part-way through closing a bar has candles and indicators out of step
+        for target in (snapshot, *(vars(state) for state in timeframes.values())):
+            if not indicators_match(target['candles'], target['indicators']):
+                return False
+        self.candles = snapshot['candles']
+        self.indicators = snapshot['indicators']
+        self.timeframes = timeframes
+        return True
+
+    def close(self):
+        if self.exporter is not None:
+            self.exporter.stop()
+        if self.candle_file is not None:
+            self.candle_file.close()
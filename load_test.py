@@ -0,0 +1,113 @@
+import argparse
+import threading
+import time
+import numpy as np
+import requests
+import oanda_trading
+from bar_aggregator import parse_timestamp
+from execution import OrderGateway
+from instrument_state import InstrumentState
+from strategies import RsiStrategy, StrategyEngine
+from stream_decoder import Tick
+
+DEFAULT_INSTRUMENTS = "EUR_USD,GBP_USD,USD_JPY,AUD_USD,USD_CAD,USD_CHF,NZD_USD,EUR_GBP,EUR_JPY,GBP_JPY"
+
+
+def tick_epoch(timestamp):
+    """Epoch seconds of an RFC3339 tick time, including the fraction."""
+    fraction = timestamp[20:-1]
+    return parse_timestamp(timestamp) + (float(f"0.{fraction}") if fraction else 0.0)
+
+
+def drain(url, params, stop_event):
+    """Extra stream client that reads and discards lines, to load the server."""
+    try:
+        with requests.get(url, params=params, stream=True, timeout=(3.05, 30)) as response:
+            for _ in response.iter_lines():
+                if stop_event.is_set():
+                    return
+    except requests.RequestException as e:
+        print(f"Extra client error: {e}")
+
+
+def run_level(url, instruments, rate, duration, clients=0):
+    """Run stream_forex_data against a synthetic stream at `rate` ticks per second.
+
+    Returns the received tick rate and how far behind generation time the pipeline was.
+    """
+    oanda_trading.instruments.clear()
+    oanda_trading.strategy_engine = StrategyEngine()
+    for name in instruments:
+        oanda_trading.strategy_engine.register(name, RsiStrategy())
+        oanda_trading.instruments[name] = InstrumentState(name)
+    # Trade decisions run as usual, but orders go nowhere
+    oanda_trading.account_state.balance = 100000.0
+    oanda_trading.order_gateway = OrderGateway(lambda intent: None).start()
+
+    params = {'source': 'synthetic', 'rate': rate, 'duration': duration, 'seed': 1}
+    lags = []
+    process = oanda_trading.process_message
+
+    def measured(api_key, account_id, message):
+        process(api_key, account_id, message)
+        if isinstance(message, Tick):
+            lags.append(time.time() - tick_epoch(message.time))
+
+    stop_event = threading.Event()
+    extra = [threading.Thread(target=drain, args=(url, dict(params, instruments=",".join(instruments)), stop_event),
+                              daemon=True) for _ in range(clients)]
+    for thread in extra:
+        thread.start()
+
+    oanda_trading.process_message = measured
+    started = time.perf_counter()
+    try:
+        query = "&".join(f"{key}={value}" for key, value in params.items())
+        oanda_trading.stream_forex_data("load-test", "load-test", f"{url}?{query}", "synthetic")
+    finally:
+        elapsed = time.perf_counter() - started
+        oanda_trading.process_message = process
+        oanda_trading.order_gateway.stop()
+        stop_event.set()
+
+    lags = np.array(lags) if lags else np.zeros(1)
+    tail = lags[-max(1, len(lags) // 10):]
+    return {
+        'offered_tps': rate,
+        'received_tps': len(lags) / elapsed,
+        'lag_p50_ms': float(np.percentile(lags, 50) * 1e3),
+        'lag_p99_ms': float(np.percentile(lags, 99) * 1e3),
+        'final_lag_ms': float(tail.mean() * 1e3),
+    }
+
+
+def keeps_up(result, max_lag_ms):
+    return result['received_tps'] >= 0.95 * result['offered_tps'] and result['final_lag_ms'] <= max_lag_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the tick rate stream_forex_data sustains against the mock server")
+    parser.add_argument('--url', default="http://localhost:5000/stream", help="Mock server stream endpoint")
+    parser.add_argument('--instruments', default=DEFAULT_INSTRUMENTS)
+    parser.add_argument('--rates', default="500,1000,2000,4000,8000,16000", help="Comma-separated ticks per second to try")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per rate")
+    parser.add_argument('--clients', type=int, default=0, help="Extra concurrent stream clients loading the server")
+    parser.add_argument('--max-lag-ms', type=float, default=250, help="Lag at which the pipeline counts as behind")
+    args = parser.parse_args()
+
+    instruments = args.instruments.split(',')
+    sustained = 0
+    for rate in (float(rate) for rate in args.rates.split(',')):
+        result = run_level(args.url, instruments, rate, args.duration, args.clients)
+        ok = keeps_up(result, args.max_lag_ms)
+        print(f"offered {result['offered_tps']:.0f}/s received {result['received_tps']:.0f}/s "
+              f"lag p50 {result['lag_p50_ms']:.1f}ms p99 {result['lag_p99_ms']:.1f}ms "
+              f"final {result['final_lag_ms']:.1f}ms {'OK' if ok else 'BEHIND'}")
+        if not ok:
+            break
+        sustained = rate
+    print(f"Sustained {sustained:.0f} ticks/s across {len(instruments)} instruments")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+
+class RollingHistogram:
+    """Keeps the last `size` durations in a ring buffer; percentiles are computed on read.
+
+    Recording is a list store and two integer updates, cheap enough for every tick.
+    """
+
+    def __init__(self, size=4096):
+        self.samples = [0.0] * size
+        self.size = size
+        self.index = 0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.samples[self.index] = seconds
+        self.index = (self.index + 1) % self.size
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self):
+        window = np.array(self.samples[:min(self.count, self.size)])
+        if not len(window):
+            return {'count': 0}
+        p50, p99 = np.percentile(window, [50, 99]) * 1e6
+        return {
+            'count': self.count,
+            'p50_us': round(float(p50), 1),
+            'p99_us': round(float(p99), 1),
+            'window_max_us': round(float(window.max()) * 1e6, 1),
+            'max_us': round(self.max * 1e6, 1),
+        }
+
+
+# Hot-path stages and counters; see observe() and increment()
+histograms = {}
+counters = {'ticks': 0, 'bars': 0, 'dropped_lines': 0, 'errors': 0, 'reconnects': 0}
+# The stream thread and the order-gateway workers record concurrently
+_lock = threading.Lock()
+
+
+def observe(stage, seconds):
+    """Record one duration for a stage."""
+    with _lock:
+        histogram = histograms.get(stage)
+        if histogram is None:
+            histogram = histograms[stage] = RollingHistogram()
+        histogram.observe(seconds)
+
+
+def increment(name, amount=1):
+    with _lock:
+        counters[name] = counters.get(name, 0) + amount
+
+
+def timed(stage):
+    """Decorator recording each call's duration under `stage`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    with _lock:
+        current = dict(counters)
+    return {
+        'counters': current,
+        'stages': {stage: histogram.summary() for stage, histogram in list(histograms.items())},
+    }
+
+
+def summary_line():
+    """One line with the counters and the p50/p99/max of each stage."""
+    with _lock:
+        current = dict(counters)
+    parts = [f"{name}={value}" for name, value in current.items()]
+    for stage, histogram in list(histograms.items()):
+        stats = histogram.summary()
+        if stats['count']:
+            parts.append(f"{stage} p50={stats['p50_us']}us p99={stats['p99_us']}us max={stats['max_us']}us")
+    return "metrics: " + " | ".join(parts)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = json.dumps(snapshot()).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host='127.0.0.1'):
+    """Expose the metrics as JSON on http://host:port/metrics from a background thread."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    return server
+
+
+def report_every(interval):
+    """Print summary_line() every `interval` seconds from a background thread."""
+    def run():
+        while True:
+            time.sleep(interval)
+            print(summary_line())
+    thread = threading.Thread(target=run, daemon=True, name="metrics-report")
+    thread.start()
+    return thread
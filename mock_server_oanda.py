@@ -1,13 +1,22 @@
-import csv
+import argparse
 import json
 import time
 import random
 from flask import Flask, Response, jsonify, request
+import numpy as np
+from bar_aggregator import parse_timestamp, roll_up
+from backtest import load_candles
+from backfill import GRANULARITY_SECONDS
+from synthetic_ticks import SyntheticTickSource
+from tick_recorder import read_ticks, STATUSES, TICK_RECORD
+from sim_broker import SimulatedBroker
 
 app = Flask(__name__)
 
 # Path to your new CSV file
 CSV_FILE_PATH = 'oanda_data_200_days_to_Nov_24.csv'
+# Directory of recorded ticks for source=recorded, see tick_recorder.py
+TICK_DIRECTORY = None
 
 # Simulated account details
 account_info = {
@@ -24,16 +33,65 @@ account_info = {
     }
 }
 
-# Generate mock price data from CSV
-def generate_mock_price_data(row):
-    """Generate a mock price update in the same format as OANDA's live API based on the CSV row."""
-    timestamp = row['time']
-    open_price = float(row['o'])
-    high_price = float(row['h'])
-    low_price = float(row['l'])
-    close_price = float(row['c'])   
-    volume = int(row['volume'])
-    complete = row['complete']
+# Transactions booked by the mock, served by the transactions stream
+transactions = []
+
+def record_transaction(transaction):
+    """Give a transaction the next id and append it to the account history."""
+    transaction['id'] = str(len(transactions) + 1)
+    transaction['time'] = f"{time.time():.9f}"
+    transactions.append(transaction)
+    account_info['account']['lastTransactionID'] = transaction['id']
+    return transaction
+
+# Matches orders, stop losses and take profits against every tick the mock streams
+broker = SimulatedBroker(account_info['account']['balance'], account_info['account']['currency'],
+                         record=record_transaction)
+
+# Last PRICE message streamed for each instrument, served again by /pricing
+latest_ticks = {}
+
+def feed_broker(tick, bid=None, ask=None):
+    """Pass a streamed PRICE tick to the simulated broker."""
+    if bid is None:
+        bid, ask = float(tick['bids'][0]['price']), float(tick['asks'][0]['price'])
+    latest_ticks[tick['instrument']] = tick
+    broker.on_tick(tick['instrument'], bid, ask)
+
+def account_details():
+    """account_info with the balance, PnL and counts taken from the simulated broker."""
+    account = account_info['account']
+    unrealized = broker.unrealized_pl()
+    account['balance'] = broker.balance
+    account['pl'] = broker.realized_pl
+    account['unrealizedPL'] = unrealized
+    account['NAV'] = broker.balance + unrealized
+    account['openTradeCount'] = len(broker.trades)
+    account['pendingOrderCount'] = len(broker.orders)
+    return account_info
+
+# Candle arrays loaded once from CSV_FILE_PATH, see get_price_data()
+price_data = None
+# Shared replay position: the row last sent on /stream and the tick sent for it.
+# /pricing, /candles and /orders all answer at this simulated time.
+replay_cursor = {'index': -1, 'tick': None}
+
+def get_price_data():
+    """Load the CSV once into NumPy arrays indexed by epoch seconds (cached as a .bin file)."""
+    global price_data
+    if price_data is None:
+        price_data = load_candles(CSV_FILE_PATH)
+    return price_data
+
+def format_timestamp(epoch):
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000000000Z', time.gmtime(epoch))
+
+# Generate mock price data from the loaded candles
+def generate_mock_price_data(index):
+    """Generate a mock price update in the same format as OANDA's live API based on one candle."""
+    prices = get_price_data()
+    timestamp = format_timestamp(int(prices['start_time'][index]))
+    close_price = float(prices['c'][index])
 
     # Generate random bid/ask prices around the close price
     bid_price = close_price - random.uniform(0.0001, 0.0005)
@@ -57,49 +115,241 @@ def generate_mock_price_data(row):
 
     return data
 
-# Stream mock price data from CSV
-def stream_mock_data():
-    """Stream mock price data from the CSV file."""
-    with open(CSV_FILE_PATH, 'r') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            data = generate_mock_price_data(row)
-            yield f"{json.dumps(data)}\n\n"
+def current_tick():
+    """The tick at the replay cursor, as it was sent on /stream."""
+    if replay_cursor['tick'] is None:
+        replay_cursor['tick'] = generate_mock_price_data(max(replay_cursor['index'], 0))
+    return replay_cursor['tick']
+
+# Stream mock price data from the loaded candles
+def stream_mock_data(speed=None, start=None, end=None):
+    """Stream mock price data, advancing the shared replay cursor.
+
+    Without `start` the replay resumes after the cursor. By default each row is sent
+    one second after the previous one. With `speed`, rows are paced by their own
+    timestamps divided by `speed` (0 means as fast as possible). `start` and `end`
+    limit the replay to a window of epoch seconds.
+    """
+    epochs = get_price_data()['start_time']
+    first = replay_cursor['index'] + 1 if start is None else int(np.searchsorted(epochs, start))
+    stop = len(epochs) if end is None else int(np.searchsorted(epochs, end, side='right'))
+    wall_start = time.time()
+    for index in range(first, stop):
+        epoch = int(epochs[index])
+        if speed:
+            # Sleep until this row's scheduled time so pacing does not drift
+            delay = wall_start + (epoch - int(epochs[first])) / speed - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        data = generate_mock_price_data(index)
+        replay_cursor['index'] = index
+        replay_cursor['tick'] = data
+        feed_broker(data)
+        yield f"{json.dumps(data)}\n\n"
+        if speed is None:
             time.sleep(1)  # Simulate real-time streaming by adding a delay
 
+def recorded_tick(instrument, tick_time, bid, ask, bid_liquidity, ask_liquidity, status):
+    """A pricing message for one recorded tick."""
+    seconds, nanoseconds = divmod(tick_time, 1_000_000_000)
+    bid = repr(bid)
+    ask = repr(ask)
+    return {
+        "type": "PRICE",
+        "time": f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))}.{nanoseconds:09d}Z",
+        "bids": [{"price": bid, "liquidity": bid_liquidity}],
+        "asks": [{"price": ask, "liquidity": ask_liquidity}],
+        "closeoutBid": bid,
+        "closeoutAsk": ask,
+        "status": STATUSES[status],
+        "tradeable": status == 0,
+        "instrument": instrument,
+    }
+
+def stream_recorded_ticks(instruments, speed=None, start=None, end=None, max_buffered=256):
+    """Replay ticks recorded with --record-ticks, merged across instruments in time order.
+
+    Ticks are paced by their recorded times divided by `speed` (real time by default,
+    0 for as fast as possible) and sent in chunks while the replay is ahead.
+    """
+    names = []
+    parts = []
+    for instrument in instruments:
+        ticks = read_ticks(TICK_DIRECTORY, instrument, start, end)
+        names.append(instrument)
+        parts.append(ticks)
+    if not parts or not sum(len(ticks) for ticks in parts):
+        return
+    which = np.repeat(np.arange(len(parts)), [len(ticks) for ticks in parts])
+    records = np.concatenate(parts)
+    order = np.argsort(records['time'], kind='stable')
+    which = which[order].tolist()
+    records = records[order]
+    columns = [records[name].tolist() for name in TICK_RECORD.names]
+    speed = 1.0 if speed is None else speed
+    first = columns[0][0]
+    wall_start = time.time()
+    buffer = []
+    for i, row in enumerate(zip(*columns)):
+        if speed:
+            delay = wall_start + (row[0] - first) / 1e9 / speed - time.time()
+            if delay > 0:
+                if buffer:
+                    yield "\n".join(buffer) + "\n"
+                    buffer = []
+                time.sleep(delay)
+        tick = recorded_tick(names[which[i]], *row)
+        feed_broker(tick, row[1], row[2])
+        buffer.append(json.dumps(tick))
+        if len(buffer) >= max_buffered:
+            yield "\n".join(buffer) + "\n"
+            buffer = []
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+def get_replay_args(args):
+    """Read the speed, start and end replay options from the /stream query string."""
+    speed = args.get('speed')
+    if speed is not None:
+        speed = 0 if speed == 'max' else float(speed)
+    start = args.get('start')
+    end = args.get('end')
+    return {
+        'speed': speed,
+        'start': parse_timestamp(start) if start else None,
+        'end': parse_timestamp(end) if end else None,
+    }
+
 # Endpoints
 
 @app.route('/stream')
 def stream():
-    """Stream mock price data."""
-    return Response(stream_mock_data(), mimetype='text/event-stream')
+    """Stream mock price data.
+
+    Query parameters: speed (replay multiplier, or 'max' for no delay), start and end
+    (RFC3339 or UNIX timestamps bounding the replay window).
+
+    With source=synthetic the ticks come from a geometric Brownian motion generator
+    instead: instruments (comma-separated), rate (ticks per second in total), spread
+    (pips), volatility (annualised), jitter (0 for fixed intervals), duration (seconds)
+    and seed. Each client gets its own generator.
+
+    With source=recorded the ticks recorded under --ticks are replayed for the
+    instruments (comma-separated), honouring speed (real time by default), start and end.
+    """
+    if request.args.get('source') == 'synthetic':
+        try:
+            source = SyntheticTickSource(
+                request.args.get('instruments', "EUR_USD").split(','),
+                rate=float(request.args.get('rate', 100)),
+                spread_pips=float(request.args.get('spread', 1.0)),
+                volatility=float(request.args.get('volatility', 0.1)),
+                jitter=float(request.args.get('jitter', 1.0)),
+                seed=int(request.args['seed']) if 'seed' in request.args else None,
+            )
+            duration = float(request.args['duration']) if 'duration' in request.args else None
+        except ValueError:
+            return jsonify({"error": "Invalid synthetic stream parameters"}), 400
+        return Response(source.lines(duration, on_tick=feed_broker), mimetype='application/octet-stream')
+
+    try:
+        replay_args = get_replay_args(request.args)
+    except (ValueError, IndexError):
+        return jsonify({"error": "Invalid replay parameters"}), 400
+    if request.args.get('source') == 'recorded':
+        if TICK_DIRECTORY is None:
+            return jsonify({"error": "Start the server with --ticks to replay recorded ticks"}), 400
+        instruments = request.args.get('instruments', "EUR_USD").split(',')
+        return Response(stream_recorded_ticks(instruments, **replay_args), mimetype='application/octet-stream')
+    return Response(stream_mock_data(**replay_args), mimetype='text/event-stream')
 
 @app.route('/v3/accounts/<account_id>', methods=['GET'])
 def get_account_info(account_id):
     """Return mock account details."""
     if account_id == account_info['account']['id']:
-        return jsonify(account_info)
+        return jsonify(account_details())
     else:
         return jsonify({"error": "Account not found"}), 404
 
 @app.route('/v3/accounts/<account_id>/pricing', methods=['GET'])
 def get_current_price(account_id):
-    """Return current price from CSV data for a specific instrument."""
-    instrument = request.args.get('instruments')
+    """Return the latest streamed price of each requested instrument.
+
+    Any instrument the simulated broker has a price for is served; EUR_USD falls
+    back to the CSV row at the replay cursor before anything has been streamed.
+    """
+    prices = []
+    for instrument in request.args.get('instruments', '').split(','):
+        if instrument in latest_ticks:
+            prices.append(latest_ticks[instrument])
+        elif instrument == "EUR_USD":
+            if not len(get_price_data()['c']):
+                return jsonify({"error": "No data available"}), 404
+            prices.append(current_tick())
+        else:
+            return jsonify({"error": f"Instrument {instrument} not supported"}), 400
+    return jsonify({"prices": prices})
+
+@app.route('/v3/instruments/<instrument>/candles', methods=['GET'])
+def get_candles(instrument):
+    """Return complete candles up to the replay cursor.
+
+    Supports count, from, to and minute-or-coarser granularities, which are rolled up
+    from the M1 rows. The CSV holds a single price series, so every requested price
+    component (B, M, A) carries the same values.
+    """
     if instrument != "EUR_USD":
         return jsonify({"error": "Instrument not supported"}), 400
+    granularity = request.args.get('granularity', 'M1')
+    seconds = GRANULARITY_SECONDS.get(granularity)
+    if seconds is None:
+        return jsonify({"error": f"Granularity {granularity} not supported"}), 400
+    try:
+        # A from/to range is not capped by the default count
+        default_count = 5000 if 'from' in request.args and 'to' in request.args else 500
+        count = min(int(request.args.get('count', default_count)), 5000)
+        from_time = parse_timestamp(request.args['from']) if 'from' in request.args else None
+        to_time = parse_timestamp(request.args['to']) if 'to' in request.args else None
+    except (ValueError, IndexError):
+        return jsonify({"error": "Invalid candle parameters"}), 400
 
-    with open(CSV_FILE_PATH, 'r') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            data = generate_mock_price_data(row)
-            return jsonify({"prices": [data]})
+    prices = get_price_data()
+    epochs = prices['start_time']
+    if not len(epochs):
+        return jsonify({"instrument": instrument, "granularity": granularity, "candles": []})
+    # Candles are complete once the cursor has moved past their bucket
+    now = int(epochs[max(replay_cursor['index'], 0)])
+    end_time = now - now % seconds
+    if to_time is not None:
+        end_time = min(end_time, to_time - to_time % seconds)
+    hi = int(np.searchsorted(epochs, end_time))
+    if from_time is not None:
+        lo = int(np.searchsorted(epochs, from_time - from_time % seconds))
+    else:
+        # Rows are M1, so this many rows covers at least `count` buckets
+        lo = max(0, hi - count * max(1, seconds // 60))
+        if lo and int(epochs[lo]) % seconds:
+            # Start at the next whole bucket rather than a partial one
+            lo = int(np.searchsorted(epochs, int(epochs[lo]) - int(epochs[lo]) % seconds + seconds))
+    if hi <= lo:
+        return jsonify({"instrument": instrument, "granularity": granularity, "candles": []})
+    rolled = roll_up({name: prices[name][lo:hi] for name in prices}, seconds)
+    keep = slice(0, count) if from_time is not None else slice(-count, None)
 
-    return jsonify({"error": "No data available"}), 404
+    components = {'B': 'bid', 'M': 'mid', 'A': 'ask'}
+    requested = [components[c] for c in request.args.get('price', 'M') if c in components]
+    candles = []
+    for t, o, h, l, c, v in zip(*(rolled[name][keep] for name in ('start_time', 'o', 'h', 'l', 'c', 'volume'))):
+        ohlc = {"o": f"{o:.5f}", "h": f"{h:.5f}", "l": f"{l:.5f}", "c": f"{c:.5f}"}
+        candle = {"complete": True, "volume": int(v), "time": format_timestamp(int(t))}
+        for name in requested:
+            candle[name] = ohlc
+        candles.append(candle)
+    return jsonify({"instrument": instrument, "granularity": granularity, "candles": candles})
 
 @app.route('/v3/accounts/<account_id>/orders', methods=['POST'])
 def place_order(account_id):
-    """Simulate placing an order."""
+    """Fill a market order through the simulated broker at the current bid/ask."""
     if account_id != account_info['account']['id']:
         return jsonify({"error": "Account not found"}), 404
 
@@ -109,52 +359,98 @@ def place_order(account_id):
 
     # Extract order details
     instrument = order_data.get("instrument", "EUR_USD")
-    units = int(order_data.get("units", 0))
-    stop_loss = order_data.get("stopLossOnFill", {}).get("price")
-    take_profit = order_data.get("takeProfitOnFill", {}).get("price")
-
-    # Mock a successful order response
-    order_response = {
-        "orderCreateTransaction": {
-            "type": "MARKET_ORDER",
-            "instrument": instrument,
-            "units": units,
-            "timeInForce": order_data.get("timeInForce", "FOK"),
-            "priceBound": None,
-            "positionFill": order_data.get("positionFill", "DEFAULT"),
-            "stopLossOnFill": stop_loss,
-            "takeProfitOnFill": take_profit,
-            "reason": "CLIENT_ORDER"
-        },
-        "orderFillTransaction": {
-            "price": random.uniform(1.10, 1.20),
-            "units": units,
-            "instrument": instrument,
-            "pl": random.uniform(-100, 100)
-        }
-    }
+    try:
+        units = int(float(order_data.get("units", 0)))
+        stop_loss = (order_data.get("stopLossOnFill") or {}).get("price")
+        take_profit = (order_data.get("takeProfitOnFill") or {}).get("price")
+        stop_loss = float(stop_loss) if stop_loss is not None else None
+        take_profit = float(take_profit) if take_profit is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid order data"}), 400
+    if instrument not in broker.prices and instrument == "EUR_USD" and len(get_price_data()['c']):
+        # No tick streamed yet: price the order at the replay cursor
+        feed_broker(current_tick())
 
-    # Simulate account balance update
-    account_info['account']['balance'] += order_response["orderFillTransaction"]["pl"]
+    create, result = broker.market_order(instrument, units, stop_loss, take_profit)
+    key = "orderFillTransaction" if result['type'] == 'ORDER_FILL' else "orderCancelTransaction"
+    return jsonify({"orderCreateTransaction": create, key: result,
+                    "lastTransactionID": result['id']}), 201
 
-    return jsonify(order_response)
+@app.route('/v3/accounts/<account_id>/summary', methods=['GET'])
+def get_account_summary(account_id):
+    """Return the mock account summary."""
+    if account_id != account_info['account']['id']:
+        return jsonify({"error": "Account not found"}), 404
+    summary = dict(account_details())
+    summary["lastTransactionID"] = account_info['account'].get('lastTransactionID', "0")
+    return jsonify(summary)
+
+@app.route('/v3/accounts/<account_id>/openPositions', methods=['GET'])
+def get_open_positions(account_id):
+    """Return the net positions held by the simulated broker."""
+    if account_id != account_info['account']['id']:
+        return jsonify({"error": "Account not found"}), 404
+    positions = [{
+        "instrument": instrument,
+        "long": {"units": str(max(units, 0))},
+        "short": {"units": str(min(units, 0))}
+    } for instrument, units in broker.positions().items()]
+    return jsonify({"positions": positions})
+
+@app.route('/v3/accounts/<account_id>/pendingOrders', methods=['GET'])
+def get_pending_orders(account_id):
+    """Return the stop-loss and take-profit orders waiting on open trades."""
+    if account_id != account_info['account']['id']:
+        return jsonify({"error": "Account not found"}), 404
+    return jsonify({"orders": broker.pending_orders()})
+
+def stream_transactions():
+    """Stream booked transactions as they happen, with a heartbeat every 5 seconds."""
+    sent = len(transactions)
+    last_heartbeat = time.time()
+    while True:
+        while sent < len(transactions):
+            yield f"{json.dumps(transactions[sent])}\n"
+            sent += 1
+        if time.time() - last_heartbeat >= 5:
+            last_heartbeat = time.time()
+            heartbeat = {"type": "HEARTBEAT", "lastTransactionID": str(len(transactions)), "time": f"{last_heartbeat:.9f}"}
+            yield f"{json.dumps(heartbeat)}\n"
+        time.sleep(0.1)
+
+@app.route('/v3/accounts/<account_id>/transactions/stream')
+def transactions_stream(account_id):
+    """Stream mock account transactions."""
+    return Response(stream_transactions(), mimetype='application/octet-stream')
 
 @app.route('/v3/accounts/<account_id>/trades', methods=['GET'])
 def get_open_trades(account_id):
-    """Simulate fetching open trades."""
+    """Return the simulated broker's open trades."""
     if account_id != account_info['account']['id']:
         return jsonify({"error": "Account not found"}), 404
 
     open_trades = [{
-        "instrument": "EUR_USD",
-        "units": 1000,
-        "price": 1.17500,
-        "unrealizedPL": 50.00,
+        "id": trade.id,
+        "instrument": trade.instrument,
+        "currentUnits": str(trade.units),
+        "price": trade.price,
+        "stopLossOrderID": trade.sl_order,
+        "takeProfitOrderID": trade.tp_order,
         "state": "OPEN"
-    }]
+    } for trade in list(broker.trades.values())]
 
     return jsonify({"trades": open_trades})
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    parser = argparse.ArgumentParser(description="Mock OANDA server")
+    parser.add_argument('--csv', default=CSV_FILE_PATH, help="Candle CSV to replay")
+    parser.add_argument('--ticks', default=None, help="Directory of recorded ticks to replay on /stream?source=recorded")
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--no-debug', action='store_true', help="Run without the debugger and reloader")
+    args = parser.parse_args()
+    CSV_FILE_PATH = args.csv
+    TICK_DIRECTORY = args.ticks
+
+    # Threaded so several stream clients can be served at once
+    app.run(debug=not args.no_debug, port=args.port, threaded=True)
 
@@ -0,0 +1,85 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URLS = {
+    'practice': "https://api-fxpractice.oanda.com",
+    'real': "https://api-fxtrade.oanda.com",
+}
+MOCK_URL = "http://localhost:5000"
+
+# Shared settings for every REST call; see configure()
+settings = {
+    'base_url': API_URLS['practice'],
+    'pool_size': 10,
+    'timeout': (3.05, 10),  # (connect, read) seconds
+}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def configure(base_url=None, pool_size=None, timeout=None):
+    """Set the REST base URL, connection pool size and timeouts used by all calls."""
+    if base_url is not None:
+        settings['base_url'] = base_url.rstrip('/')
+    if pool_size is not None:
+        settings['pool_size'] = pool_size
+    if timeout is not None:
+        settings['timeout'] = timeout
+    close_sessions()
+
+
+def get_api_url(account_type, mock=False):
+    if mock:
+        return MOCK_URL
+    return API_URLS[account_type]
+
+
+def get_session(url):
+    """Return the keep-alive Session for the URL's host, creating it on first use."""
+    host = urlsplit(url).netloc
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings['pool_size'])
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sessions[host] = session
+    return session
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def get_oanda_headers(api_key):
+    return {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json'
+    }
+
+
+def request(method, path, api_key, **kwargs):
+    """Send a request to `path` under the configured base URL over a pooled connection.
+
+    `path` may also be a full URL (e.g. the streaming endpoint).
+    """
+    url = path if path.startswith('http') else f"{settings['base_url']}{path}"
+    kwargs.setdefault('timeout', settings['timeout'])
+    return get_session(url).request(method, url, headers=get_oanda_headers(api_key), **kwargs)
+
+
+def get(path, api_key, **kwargs):
+    return request('GET', path, api_key, **kwargs)
+
+
+def post(path, api_key, **kwargs):
+    return request('POST', path, api_key, **kwargs)
@@ -1,181 +1,242 @@
+import time
+# Captured before the other imports on purpose, so "Started in" includes import time
+STARTED = time.perf_counter()
 import argparse
+import configparser
+import os
 import requests
-import json
-import v20
+import random
 import signal
 import sys
-import time
-import pandas as pd
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, time as dt_time
-import pandas_ta as ta
+from functools import partial
 import traceback
-
-def initialize_ohlc(instrument):
-    """Initialize the OHLC data structure for an instrument."""
-    ohlc_data[instrument] = {
-        'o': None,
-        'h': float('-inf'),
-        'l': float('inf'),
-        'c': None,
-        'volume': 0,
-        'start_time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
-    }
-    tick_count[instrument] = 0  # Track number of ticks (volume)
-    
-def update_ohlc(instrument, price):
-    """Update OHLC data for each price update."""
-    if not instrument in ohlc_data:
+from indicators import IndicatorGraph
+from candle_file import CandleFile, PeriodicExporter, CANDLE_RECORD, candle_file_path
+from instrument_state import InstrumentState
+import numpy as np
+from strategies import StrategyEngine, STRATEGIES
+from bar_aggregator import parse_timestamp
+from execution import OrderGateway, make_intent
+import oanda_client
+import backfill
+from account_state import AccountState, get_transactions_stream_url
+import metrics
+from tick_recorder import TickRecorder
+from stream_decoder import DECODERS, FastStreamDecoder, Heartbeat, Tick, message_from_dict
+from snapshot import snapshot_path, save_snapshot, load_snapshot
+
+def process_forex_data(api_key, account_id, data):
+    """Process one parsed stream message (a dict); see process_message."""
+    try:
+        if data.get('type') == 'PRICE' and tick_recorder is not None:
+            tick_recorder.record(data)
+        message = message_from_dict(data)
+    except (KeyError, IndexError, ValueError) as e:
+        metrics.increment('errors')
+        print(f"Error: Missing expected field {e} in data")
+        traceback.print_exc()
         return
-    if ohlc_data[instrument]['o'] is None:
-        # Set the open price on the first tick
-        ohlc_data[instrument]['o'] = price
-
-    # Update high, low, close, and volume
-    ohlc_data[instrument]['h'] = max(ohlc_data[instrument]['h'], price)
-    ohlc_data[instrument]['l'] = min(ohlc_data[instrument]['l'], price)
-    ohlc_data[instrument]['c'] = price
-    ohlc_data[instrument]['volume'] += 1
-    tick_count[instrument] += 1
-
-def reset_ohlc(instrument):
-    """Reset OHLC data"""
-    # Reset the OHLC for the next time window
-    ohlc_data[instrument] = {
-        'o': None,
-        'h': float('-inf'),
-        'l': float('inf'),
-        'c': None,
-        'volume': 0,
-        'start_time': time.strftime('%Y-%m-%d %H:%M:00', time.localtime(time.time()))
-    }
-    tick_count[instrument] = 0  # Reset tick count (volume)
+    if message is not None:
+        process_message(api_key, account_id, message)
 
-def process_forex_data(api_key, account_id, data, instrument, timeframe=60):
-    """Process the incoming stream data, updating OHLC"""
-    if not instrument in ohlc_data:
-        return
-    global ohlc_df
+def process_message(api_key, account_id, message):
+    """Process a decoded Tick or Heartbeat, updating the bars of the tick's instrument on event time"""
     try:
-        if data.get('type') == 'PRICE':
-            instrument = data['instrument']
-            # Extract the first bid price
-            if 'bids' in data and len(data['bids']) > 0:
-                bid_price = float(data['bids'][0]['price'])
-
-                update_ohlc(instrument, bid_price)
-
-                # Check if the time window has elapsed
-                current_time = time.time()
-                t_struct = time.strptime(ohlc_data[instrument]['start_time'], '%Y-%m-%d %H:%M:%S')
-                if current_time - time.mktime(t_struct) >= timeframe:
-                    start_time = ohlc_data[instrument]['start_time']
-
-                    open_price = ohlc_data[instrument]['o']
-                    high_price = ohlc_data[instrument]['h']
-                    low_price = ohlc_data[instrument]['l']
-                    close_price = ohlc_data[instrument]['c']
-
-                    new_row = pd.DataFrame({
-                        'start_time': [start_time],
-                        'o': [open_price],
-                        'h': [high_price],
-                        'l': [low_price],
-                        'c': [close_price],
-                        'volume': [ohlc_data[instrument]['volume']]
-                    })
-
-                    # Ensure the new row doesn't contain empty or all-NA entries
-                    if not new_row.isna().all(axis=1).any():
-                        # Append the new row to the existing DataFrame
-                        ohlc_df = pd.concat([ohlc_df if not ohlc_df.empty else None, new_row], ignore_index=True)
-
-                    #print(f"\nUpdated OHLC DataFrame:\n{ohlc_df}\n")
-
-                    # Save the DataFrame to a CSV file
-                    ohlc_df.to_csv('ohlc_data.csv', index=False)
-                    # Calculate indicators
-                    calculate_indicators(ohlc_df)
-                    trade_based_on_rsi(api_key, account_id, instrument, sl=25, tp=25)
-
-                    # Reset the OHLC data for the next time window
-                    reset_ohlc(instrument)
-            else:
+        if isinstance(message, Tick):
+            if message.line is not None and tick_recorder is not None:
+                tick_recorder.record_line(message.line)
+            state = instruments.get(message.instrument)
+            if state is None:
+                return
+            metrics.increment('ticks')
+            if message.bid is None:
                 print("No bid data available for price update.")
+                return
+            started = time.perf_counter()
+            closed = state.aggregator.update(parse_timestamp(message.time), message.bid)
+            metrics.observe('ohlc_update', time.perf_counter() - started)
+            for bar in closed:
+                close_bar(api_key, account_id, state, bar)
+        elif isinstance(message, Heartbeat):
+            # Heartbeats move event time forward, closing bars on quiet instruments
+            epoch = parse_timestamp(message.time)
+            for state in instruments.values():
+                for bar in state.aggregator.advance(epoch):
+                    close_bar(api_key, account_id, state, bar)
 
-    except KeyError as e:
-        print(f"Error: Missing expected field {e} in data")
-        traceback.print_exc()
     except Exception as e:
+        metrics.increment('errors')
         print(f"Unexpected error while processing data: {e}")
         traceback.print_exc()
 
-def stream_forex_data(account_id, api_key, stream_url, server_name):
-    """Connect to OANDA API and receive streaming OHLC data."""
+def close_bar(api_key, account_id, state, bar):
+    """Store a closed bar, update indicators and run the strategy."""
+    start_time = bar[0]
+    if not state.candles.empty and start_time <= state.candles.last('start_time'):
+        return  # Already covered by the historical backfill
+    started = time.perf_counter()
+    state.candles.append(*bar)
+
+    # Append the closed candle to the on-disk history
+    if state.candle_file is not None:
+        state.candle_file.append(*bar)
+    # Calculate indicators
+    calculate_indicators(state)
+    for timeframe_state, higher_bar in state.roll_up(bar):
+        close_timeframe_bar(api_key, account_id, timeframe_state, higher_bar)
+    run_strategies(api_key, account_id, state, state.granularity)
+    metrics.increment('bars')
+    metrics.observe('bar_close', time.perf_counter() - started)
+
+def close_timeframe_bar(api_key, account_id, state, bar):
+    """Store a closed higher-timeframe bar, update its indicators and run its strategies."""
+    state.candles.append(*bar)
+    state.candles.set_last(**state.indicators.update(bar[4]))
+    run_strategies(api_key, account_id, state, state.granularity)
+
+def stream_forex_data(account_id, api_key, stream_url, server_name, read_timeout=None, on_connect=None):
+    """Connect to OANDA API and receive streaming OHLC data for every tracked instrument.
+
+    Returns the number of lines received once the stream ends, fails, or stays silent
+    (no price or heartbeat) for `read_timeout` seconds. `on_connect` runs once the
+    connection is accepted, before any line is processed.
+    """
+    decoder = stream_decoder(keep_lines=tick_recorder is not None)
     try:
         print(f"Connecting to {server_name} server")
         # Parameters for the streaming request (instruments to receive data for)
-        params = {'instruments': "EUR_USD",}
+        params = {'instruments': ",".join(instruments)}
 
         # Open a connection to the streaming API
-        response = requests.get(stream_url, headers=get_oanda_headers(api_key), params=params, stream=True)
+        connect_timeout = oanda_client.settings['timeout'][0]
+        response = oanda_client.get(stream_url, api_key, params=params, stream=True,
+                                    timeout=(connect_timeout, read_timeout))
 
         # Check if connection is established
         if response.status_code != 200:
             print(f"Error connecting to server:{server_name}\n \
                     Error: {response.status_code}")
             print(response.text)
-            return
-
-        # Stream the data line-by-line
-        for line in response.iter_lines():
-            if line:
-                #print(f"Data received: {line}")
-                decoded_line = line.decode('utf-8')
-                if "EUR_USD" in ohlc_data:
-                    pass
-                elif time.localtime().tm_sec == 0:
-                    initialize_ohlc("EUR_USD")
-                try:
-                    data = json.loads(decoded_line)
-                    process_forex_data(api_key, account_id, data, "EUR_USD")
-                except json.JSONDecodeError:
-                    print("Error decoding stream data")
-                    traceback.print_exc()
+            return decoder.lines
+        if on_connect is not None:
+            on_connect()
+
+        # Decode raw chunks as they arrive rather than splitting them into lines first
+        dropped = 0
+        for chunk in response.iter_content(chunk_size=None):
+            started = time.perf_counter()
+            messages = decoder.feed(chunk)
+            metrics.observe('decode', time.perf_counter() - started)
+            if decoder.dropped != dropped:
+                metrics.increment('dropped_lines', decoder.dropped - dropped)
+                dropped = decoder.dropped
+            for message in messages:
+                process_message(api_key, account_id, message)
+            if stop_requested.is_set():
+                return decoder.lines
+        for message in decoder.flush():
+            process_message(api_key, account_id, message)
 
     except requests.RequestException as e:
+        metrics.increment('errors')
         print(f"Streaming error: {e}")
         traceback.print_exc()
+    return decoder.lines
+
+def fill_gaps(api_key, workers=4):
+    """After a reconnect, fetch the bars missed while disconnected and replay them into every instrument.
+
+    The bar left open at the disconnect is dropped first, so live ticks never close it
+    or fill the outage with flat bars, whether or not the gap fill succeeds.
+    """
+    started = time.perf_counter()
+    for state in instruments.values():
+        state.aggregator.reset()
+        if state.candle_file is None or state.candles.empty:
+            continue
+        try:
+            last = state.candles.last('start_time')
+            written = backfill.backfill(api_key, state.instrument, state.candle_file, last, workers=workers)
+            stored = state.candle_file.read()
+            newer = stored[int(np.searchsorted(stored['start_time'], last, side='right')):]
+            replay_bars(state, newer)
+            if len(newer):
+                print(f"Filled {len(newer)} missed bars for {state.instrument} ({written} downloaded)")
+        except Exception as e:
+            metrics.increment('errors')
+            print(f"Error filling missed bars for {state.instrument}: {e}")
+            traceback.print_exc()
+    metrics.observe('gap_fill', time.perf_counter() - started)
+
+def run_stream(account_id, api_key, stream_url, server_name, read_timeout=20, max_backoff=60, backfill_workers=4):
+    """Keep the pricing stream open, reconnecting with exponential backoff.
+
+    A stream that stays silent for `read_timeout` seconds (OANDA sends a heartbeat
+    every 5 seconds) counts as dead. After each reconnect the bars missed in between
+    are filled from the candles endpoint before live ticks are processed.
+    """
+    delay = 1
+    on_connect = None
+    while not stop_requested.is_set():
+        if stream_forex_data(account_id, api_key, stream_url, server_name, read_timeout, on_connect):
+            delay = 1
+        if stop_requested.is_set():
+            break
+        metrics.increment('reconnects')
+        wait = delay + random.random()
+        print(f"{server_name} stream closed, reconnecting in {wait:.1f}s")
+        stop_requested.wait(wait)
+        delay = min(delay * 2, max_backoff)
+        on_connect = partial(fill_gaps, api_key, backfill_workers)
 
 def signal_handler(sig, frame):
-    print("\nReceived CTRL C\nExiting...")
-    sys.exit(0)
-
-def calculate_indicators(ohlc_df):
-    calculate_ema(ohlc_df, 10)
-    calculate_sma(ohlc_df, 10)
-    calculate_rsi(ohlc_df)
-    print(ohlc_df[['start_time', 'c', 'ema_10', 'sma_10', 'RSI']])
-
-def calculate_ema(ohlc_df, length):
-    ohlc_df[f'ema_{length}'] = ta.ema(ohlc_df['c'], length=length)
-
-def calculate_sma(ohlc_df, length):
-    ohlc_df[f'sma_{length}'] = ta.sma(ohlc_df['c'], length=length)
-
-def calculate_rsi(ohlc_df):
-    ohlc_df['RSI'] = ta.rsi(ohlc_df['c'], length=14)
-
-def get_oanda_headers(api_key):
-    return {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
+    """Ask the stream loop to stop; it finishes the message in hand and main() shuts down."""
+    if stop_requested.is_set():
+        print("\nExiting without saving")
+        sys.exit(1)
+    print(f"\nReceived {signal.Signals(sig).name}\nExiting...")
+    stop_requested.set()
+
+def shutdown():
+    """Report, flush the recorder and save the snapshot; runs between messages, never mid-bar."""
+    if order_gateway is not None:
+        print(f"Order gateway latency: {order_gateway.summary()}")
+    print(metrics.summary_line())
+    if tick_recorder is not None:
+        tick_recorder.stop()
+        print(f"Recorded {tick_recorder.written} ticks to {tick_recorder.directory}")
+    if snapshot_file is not None and instruments:
+        started = time.perf_counter()
+        if save_snapshot(snapshot_file, instruments):
+            print(f"Saved snapshot to {snapshot_file} in {time.perf_counter() - started:.3f}s")
+    for state in instruments.values():
+        state.close()
+
+def calculate_indicators(state):
+    """Update the running indicators with the newest candle and store them on its row."""
+    candles = state.candles
+    started = time.perf_counter()
+    values = state.indicators.update(candles.last('c'))
+    candles.set_last(**values)
+    metrics.observe('indicators', time.perf_counter() - started)
+    indicator_values = " ".join(f"{name}={value}" for name, value in values.items())
+    print(f"{state.instrument} {backfill.format_time(int(candles.last('start_time')))} c={candles.last('c')} {indicator_values}")
+
+def seed_indicators(state):
+    """Replay the historical candles through fresh indicator engines, on every timeframe."""
+    state.rebuild_timeframes()
+    for target in (state, *state.timeframes.values()):
+        target.indicators = IndicatorGraph(target.indicators.keys())
+        for column, values in target.indicators.seed(target.candles.column('c')).items():
+            target.candles.column(column)[:] = values
 
 def get_current_price(api_key, account_id, instrument):
     """Fetch the current bid/ask prices for an instrument."""
-    url = f"https://api-fxpractice.oanda.com/v3/accounts/{account_id}/pricing"
     params = {"instruments": instrument}
-    response = requests.get(url, headers=get_oanda_headers(api_key), params=params)
+    response = oanda_client.get(f"/v3/accounts/{account_id}/pricing", api_key, params=params)
 
     if response.status_code == 200:
         prices = response.json().get('prices', [])
@@ -188,6 +249,7 @@ def get_current_price(api_key, account_id, instrument):
         print(f"Failed to fetch price data: {response.status_code} - {response.text}")
         return None
 
+@metrics.timed('order_round_trip')
 def place_order(api_key, account_id, instrument="EUR_USD", units=100, sl=None, tp=None):
 
     price_data = get_current_price(api_key, account_id, instrument)
@@ -203,9 +265,10 @@ def place_order(api_key, account_id, instrument="EUR_USD", units=100, sl=None, t
     # Determine pip value (standard or JPY-specific)
     pip_value = 0.0001 if "JPY" not in instrument else 0.01
 
-    # Calculate stop loss and take profit prices if provided
-    stop_loss_price = current_price - (sl * pip_value) if sl is not None else None
-    take_profit_price = current_price + (tp * pip_value) if tp is not None else None
+    # Calculate stop loss and take profit prices if provided: below/above the price for buys, the other way for sells
+    direction = 1 if units > 0 else -1
+    stop_loss_price = current_price - direction * sl * pip_value if sl is not None else None
+    take_profit_price = current_price + direction * tp * pip_value if tp is not None else None
 
     # Create the order data
     order_data = {
@@ -225,10 +288,8 @@ def place_order(api_key, account_id, instrument="EUR_USD", units=100, sl=None, t
         order_data['order']['takeProfitOnFill'] = {"price": f"{take_profit_price:.5f}"}
 
     # OANDA API endpoint for placing an order
-    url = f"https://api-fxpractice.oanda.com/v3/accounts/{account_id}/orders"
-
     # Make the API request to place the order
-    response = requests.post(url, headers=get_oanda_headers(api_key), json=order_data)
+    response = oanda_client.post(f"/v3/accounts/{account_id}/orders", api_key, json=order_data)
     if response.status_code == 201:
         print(f"Order placed successfully for {instrument}.")
         return response.json()
@@ -244,8 +305,7 @@ def sell_order(api_key, account_id, instrument, units, sl, tp):
 
 def get_account_balance(api_key, account_id):
     """Fetch the current balance of the OANDA account."""
-    url = f"https://api-fxpractice.oanda.com/v3/accounts/{account_id}/summary"
-    response = requests.get(url, headers=get_oanda_headers(api_key))
+    response = oanda_client.get(f"/v3/accounts/{account_id}/summary", api_key)
 
     if response.status_code == 200:
         account_info = response.json().get('account', {})
@@ -255,7 +315,10 @@ def get_account_balance(api_key, account_id):
         return None
 
 def calculate_pos(api_key, account_id, leverage=15):
-    balance = get_account_balance(api_key, account_id)
+    # The cached balance avoids a REST call; fall back to one before the cache is seeded
+    balance = account_state.balance
+    if balance is None:
+        balance = get_account_balance(api_key, account_id)
     return int(balance*leverage)
 
 def should_trade():
@@ -275,9 +338,8 @@ def should_trade():
     return False
 
 def get_open_positions(api_key, account_id, instrument):
-    url = f"https://api-fxpractice.oanda.com/v3/accounts/{account_id}/openPositions"
     try:
-        response = requests.get(url, headers=get_oanda_headers(api_key))
+        response = oanda_client.get(f"/v3/accounts/{account_id}/openPositions", api_key)
         if not response.json()['positions']:
             return None
         # Check if there is an open position for the given instrument
@@ -297,40 +359,63 @@ def get_open_positions(api_key, account_id, instrument):
         print(f"Error fetching positions: {e}")
         return None
 
-def trade_based_on_rsi(api_key, account_id, instrument, sl, tp):
-    if ohlc_df.empty:
-        return
-
-    # Get the latest RSI value
-    latest_rsi = ohlc_df['RSI'].iloc[-1]
-    if latest_rsi == None:
-        print("No rsi data. Not getting into a trade yet")
-        return
-    position = calculate_pos(api_key, account_id)
-    if get_open_positions(api_key, account_id, instrument):
+def run_strategies(api_key, account_id, state, granularity):
+    """Run the strategies registered on this instrument and timeframe and act on their signals."""
+    for strategy_signal in strategy_engine.evaluate(state, granularity):
+        trade_on_signal(api_key, account_id, state.instrument, strategy_signal)
+
+def trade_on_signal(api_key, account_id, instrument, strategy_signal):
+    """Check the position and trading hours, then hand the trade to the order gateway."""
+    # Positions and balance come from the local account cache, not REST
+    started = time.perf_counter()
+    open_position = account_state.get_position(instrument)
+    metrics.observe('position_check', time.perf_counter() - started)
+    if open_position:
         print(f"There is an open position, not opening another one")
         return
     # Only proceed if we're in the correct trading hours
-    if should_trade():
-        # Check for a buy signal: RSI < 30 and no position open
-        if latest_rsi < 30:
-            print(f"RSI is {latest_rsi}. Entering buy position.")
-            buy_order(api_key, account_id, instrument, position, sl, tp)
-
-        # Check for a sell signal: RSI > 70 and no position open
-        elif latest_rsi > 70:
-            print(f"RSI is {latest_rsi}. Entering sell position.")
-            sell_order(api_key, account_id, instrument, position, sl, tp)
-    else:
+    if not should_trade():
         print("Outside of trading hours, no trades executed.")
+        return
+    position = calculate_pos(api_key, account_id)
+    intent = make_intent(instrument, strategy_signal.side, position, strategy_signal.value,
+                         strategy_signal.sl, strategy_signal.tp, strategy_signal.strategy)
+    if order_gateway is None:
+        execute_trade_intent(api_key, account_id, intent)
+    else:
+        order_gateway.submit(intent)
 
-ohlc_data = {}
-tick_count = {}
-ohlc_df = pd.DataFrame(columns=['start_time', 'o', 'h', 'l', 'c', 'volume'])
-
-
-# Register the signal handler for graceful exit on Ctrl + C
+def execute_trade_intent(api_key, account_id, intent):
+    """Place the order for a trade intent and record the fill (runs off the stream thread)."""
+    if intent.side == 'buy':
+        print(f"{intent.strategy} signal at {intent.value}. Entering buy position.")
+        response = buy_order(api_key, account_id, intent.instrument, intent.units, intent.sl, intent.tp)
+    else:
+        print(f"{intent.strategy} signal at {intent.value}. Entering sell position.")
+        response = sell_order(api_key, account_id, intent.instrument, intent.units, intent.sl, intent.tp)
+    if response:
+        account_state.apply_order_response(response)
+
+# Per-instrument bar, candle and indicator state, keyed by instrument name
+instruments = {}
+# Appends every pricing tick to compressed daily files when --record-ticks is set
+tick_recorder = None
+# Set by SIGINT/SIGTERM; the stream loop stops between messages so state is consistent
+stop_requested = threading.Event()
+# Candle and indicator state is saved here on shutdown for a warm start
+snapshot_file = None
+# Decoder class for the raw pricing stream, see stream_decoder.DECODERS
+stream_decoder = FastStreamDecoder
+# Strategies registered per instrument and timeframe
+strategy_engine = StrategyEngine()
+# Executes trade intents off the stream-reading thread
+order_gateway = None
+# Balance, positions and pending orders kept in memory for the decision path
+account_state = AccountState()
+
+# Register the signal handler for graceful exit on Ctrl + C and on a service stop
 signal.signal(signal.SIGINT, signal_handler)
+signal.signal(signal.SIGTERM, signal_handler)
 
 def get_stream_url(account_type, mock, account_id):
     if account_type == 'practice':
@@ -342,77 +427,145 @@ def get_stream_url(account_type, mock, account_id):
     return stream_url
 
 def get_config(config_file):
-    account_id = None
-    access_token = None
+    """Read account_id, access_token and account_type from the [oanda] section (or a file without sections)."""
     with open(config_file, 'r') as file:
-        config_lines = file.readlines()
-    for line in config_lines:
-        if 'account_id' in line:
-            account_id = line.split('=')[1].strip()
-        elif 'access_token' in line:
-            access_token = line.split('=')[1].strip()
-        elif 'account_type' in line:
-            account_type =  line.split('=')[1].strip()
-    return account_id, access_token, account_type
+        text = file.read()
+    if not text.lstrip().startswith('['):
+        text = "[oanda]\n" + text
+    config = configparser.ConfigParser()
+    config.read_string(text)
+    section = config['oanda'] if config.has_section('oanda') else config[config.sections()[0]]
+    return section.get('account_id'), section.get('access_token'), section.get('account_type', 'practice')
 
 def get_historical_data(api_key, instrument, granularity='M1', count=1440):
-    """Fetch historical data from OANDA for the given instrument."""
-    url = f"https://api-fxpractice.oanda.com/v3/instruments/{instrument}/candles"
-    params = {
-        'count': count,  # This is approximately 1 days (assuming 1440 minutes in a day)
-        'granularity': granularity,  # 1-minute candles
-        'price': 'B'  # Bid prices
-    }
-    response = requests.get(url, headers=get_oanda_headers(api_key), params=params)
-
-    if response.status_code == 200:
-        candles = response.json().get('candles', [])
-        ohlc_list = []
-        for candle in candles:
-            if candle['complete']:  # Only consider complete candles
-                ohlc_list.append({
-                    'start_time': candle['time'],
-                    'o': float(candle['bid']['o']),
-                    'h': float(candle['bid']['h']),
-                    'l': float(candle['bid']['l']),
-                    'c': float(candle['bid']['c']),
-                    'volume': candle['volume']
-                })
-
-        return pd.DataFrame(ohlc_list)
-    else:
-        print(f"Failed to fetch historical data: {response.status_code} - {response.text}")
-        return pd.DataFrame()
-
-def initialize_ohlc_data(api_key, instrument):
-    """Initialize OHLC data by fetching historical data."""
-    global ohlc_df
-
-    # Fetch historical data for the last 10 days (using M1 candles)
-    ohlc_df = get_historical_data(api_key, instrument)
+    """Fetch the most recent `count` complete candles from OANDA for the given instrument."""
+    import pandas as pd
+
+    columns = backfill.fetch_candles(api_key, instrument, granularity, count=count)
+    return pd.DataFrame(columns) if columns is not None else pd.DataFrame()
+
+def replay_bars(state, columns):
+    """Advance candles and indicators on every timeframe over bars they have not seen, without trading."""
+    for bar in zip(*(columns[name].tolist() for name in CANDLE_RECORD.names)):
+        state.candles.append(*bar)
+        state.candles.set_last(**state.indicators.update(bar[4]))
+        for timeframe_state, higher_bar in state.roll_up(bar):
+            timeframe_state.candles.append(*higher_bar)
+            timeframe_state.candles.set_last(**timeframe_state.indicators.update(higher_bar[4]))
+
+def initialize_ohlc_data(api_key, state, days=1, workers=4, snapshot=None):
+    """Backfill the local candle file with the candles missing since it was last written, then load it.
+
+    An empty file is filled with the last `days` of history. With a matching
+    `snapshot`, candles and indicators are restored from it and only the newer
+    candles are replayed, instead of reloading and reseeding the whole history.
+    """
+    candles = state.candles
+    candle_file = state.candle_file
+    if candle_file is None:
+        candles.extend_frame(get_historical_data(api_key, state.instrument))
+        seed_indicators(state)
+        return
 
-    if not ohlc_df.empty:
-        # Ensure that the fetched historical data is saved
-        ohlc_df.to_csv('ohlc_data.csv', index=False)
-        print("Historical data successfully fetched and saved.")
+    cached = len(candle_file)
+    written = backfill.backfill(api_key, state.instrument, candle_file, time.time() - days * 86400,
+                                workers=workers)
+    stored = candle_file.read()
+    # The snapshot is only usable if the candle file covers everything it has seen
+    if (snapshot is not None and len(stored) and not snapshot['candles'].empty
+            and snapshot['candles'].last('start_time') <= stored['start_time'][-1] and state.restore(snapshot)):
+        last = state.candles.last('start_time')
+        newer = stored[int(np.searchsorted(stored['start_time'], last, side='right')):]
+        replay_bars(state, newer)
+        print(f"Warm start for {state.instrument}: {len(state.candles)} candles restored from snapshot, "
+              f"{len(newer)} newer candles replayed ({written} backfilled).")
+        return
+    if len(stored):
+        candles.extend({name: stored[name] for name in CANDLE_RECORD.names})
+        print(f"Restored {cached} cached candles for {state.instrument} from {candle_file.path} "
+              f"and backfilled {written}.")
     else:
-        print("No historical data available, starting fresh.")
+        print(f"No historical data available for {state.instrument}, starting fresh.")
+    seed_indicators(state)
 
 def main():
     parser = argparse.ArgumentParser(description="Trading with OANDA")
     parser.add_argument('--mock', action='store_true', help="Connect to the mock server instead of OANDA API")
+    parser.add_argument('--max-candles', type=int, default=None, help="Keep only the most recent N candles in memory")
+    parser.add_argument('--instruments', default="EUR_USD", help="Comma-separated instruments to stream and trade")
+    parser.add_argument('--timeframes', default="M5,M15,H1", help="Comma-separated higher timeframes rolled up from M1 bars")
+    parser.add_argument('--strategies', default="rsi", help=f"Comma-separated strategies to run on every instrument ({', '.join(STRATEGIES)})")
+    parser.add_argument('--strategy-timeframe', default="M1", help="Timeframe the strategies run on")
+    parser.add_argument('--candle-dir', default='.', help="Directory for the append-only binary candle files")
+    parser.add_argument('--export', choices=['csv', 'parquet'], default=None, help="Periodically export candles in this format")
+    parser.add_argument('--order-workers', type=int, default=1, help="Threads placing orders off the stream thread")
+    parser.add_argument('--http-pool-size', type=int, default=10, help="Pooled keep-alive connections per host")
+    parser.add_argument('--http-timeout', type=float, default=10, help="Read timeout in seconds for REST calls")
+    parser.add_argument('--reconcile-interval', type=int, default=60, help="Seconds between account state reconciliations")
+    parser.add_argument('--metrics-port', type=int, default=0, help="Serve metrics as JSON on this local port (0 disables)")
+    parser.add_argument('--metrics-interval', type=int, default=60, help="Seconds between metrics summary lines (0 disables)")
+    parser.add_argument('--backfill-days', type=float, default=1, help="Days of history to download when there are no cached candles")
+    parser.add_argument('--backfill-workers', type=int, default=4, help="Concurrent candle requests during backfill")
+    parser.add_argument('--record-ticks', default=None, help="Record every pricing tick to compressed daily files under this directory")
+    parser.add_argument('--decoder', choices=list(DECODERS), default='fast', help="Pricing stream decoder: byte-scanning fast path, or a full JSON parse of every line")
+    parser.add_argument('--stream-timeout', type=float, default=20, help="Seconds without a price or heartbeat before the pricing stream is reopened")
+    parser.add_argument('--max-backoff', type=float, default=60, help="Longest wait in seconds between stream reconnect attempts")
+    parser.add_argument('--cold-start', action='store_true', help="Ignore the shutdown snapshot and rebuild indicators from the candle files")
+    parser.add_argument('--export-interval', type=int, default=300, help="Seconds between exports")
     args = parser.parse_args()
 
+    for instrument in args.instruments.split(','):
+        for name in args.strategies.split(','):
+            strategy_engine.register(instrument, STRATEGIES[name](granularity=args.strategy_timeframe))
+        path = candle_file_path(args.candle_dir, instrument)
+        state = InstrumentState(instrument, maxlen=args.max_candles, candle_file=CandleFile(path),
+                                timeframes=[name for name in args.timeframes.split(',') if name],
+                                indicators=strategy_engine.required_indicators(instrument))
+        if args.export:
+            state.exporter = PeriodicExporter(state.candle_file, f"{os.path.splitext(path)[0]}.{args.export}",
+                                              args.export_interval)
+            state.exporter.start()
+        instruments[instrument] = state
+
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+        print(f"Serving metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+    if args.metrics_interval:
+        metrics.report_every(args.metrics_interval)
+
     config_file = 'pyalgo.cfg'
     account_id, access_token, account_type = get_config(config_file)
     stream_url = get_stream_url(account_type, args.mock, account_id)
-    instrument = "EUR_USD"
-
-    initialize_ohlc_data(access_token, instrument)
-    if args.mock:
-        stream_forex_data(account_id, access_token, stream_url, "mock")
-    else:
-        stream_forex_data(account_id, access_token, stream_url, "OANDA")
+    oanda_client.configure(base_url=oanda_client.get_api_url(account_type, args.mock),
+                           pool_size=args.http_pool_size, timeout=(3.05, args.http_timeout))
+
+    global snapshot_file
+    snapshot_file = snapshot_path(args.candle_dir)
+    snapshots = {} if args.cold_start else load_snapshot(snapshot_file)
+    # Instruments backfill and load concurrently; the REST calls dominate
+    with ThreadPoolExecutor(max_workers=len(instruments)) as executor:
+        list(executor.map(lambda state: initialize_ohlc_data(access_token, state, days=args.backfill_days,
+                                                             workers=args.backfill_workers,
+                                                             snapshot=snapshots.get(state.instrument)),
+                          instruments.values()))
+
+    global account_state, order_gateway, tick_recorder, stream_decoder
+    stream_decoder = DECODERS[args.decoder]
+    if args.record_ticks:
+        tick_recorder = TickRecorder(args.record_ticks)
+        tick_recorder.start()
+    account_state = AccountState(access_token, account_id)
+    if account_state.seed():
+        print(f"Account state seeded: balance {account_state.balance}, positions {account_state.positions}")
+    account_state.start(get_transactions_stream_url(account_type, args.mock, account_id),
+                        reconcile_interval=args.reconcile_interval)
+    order_gateway = OrderGateway(partial(execute_trade_intent, access_token, account_id),
+                                 workers=args.order_workers).start()
+    print(f"Started in {time.perf_counter() - STARTED:.2f}s, subscribing to the pricing stream")
+    server_name = "mock" if args.mock else "OANDA"
+    run_stream(account_id, access_token, stream_url, server_name, read_timeout=args.stream_timeout,
+               max_backoff=args.max_backoff, backfill_workers=args.backfill_workers)
+    shutdown()
 
 
 if __name__ == "__main__":
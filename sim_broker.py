@@ -0,0 +1,262 @@
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+
+Trade = namedtuple('Trade', ['id', 'instrument', 'units', 'price', 'sl_order', 'tp_order'])
+
+
+class TriggerBook:
+    """Stop-loss and take-profit levels of one instrument's open trades, in four heaps.
+
+    Longs close on the bid: stops trigger at or below their price, take-profits at
+    or above. Shorts close on the ask, the other way round. Each heap keeps the level
+    nearest the market on top, so a tick only peeks at four entries and pops those it
+    triggers, O(log n) each. Cancelled levels are skipped lazily when they surface.
+    """
+
+    def __init__(self):
+        self.long_sl = []   # (-price, order id), highest stop first
+        self.long_tp = []   # (price, order id), lowest target first
+        self.short_sl = []  # (price, order id), lowest stop first
+        self.short_tp = []  # (-price, order id), highest target first
+
+    def add(self, order_id, units, price, stop):
+        if units > 0:
+            heap, key = (self.long_sl, -price) if stop else (self.long_tp, price)
+        else:
+            heap, key = (self.short_sl, price) if stop else (self.short_tp, -price)
+        heapq.heappush(heap, (key, order_id))
+
+    def triggered(self, bid, ask, live):
+        """Pop and return the ids of orders triggered by this bid/ask that are still in `live`."""
+        fired = []
+        for heap, sign, price in ((self.long_sl, -1, bid), (self.short_tp, -1, ask),
+                                  (self.long_tp, 1, bid), (self.short_sl, 1, ask)):
+            while heap:
+                key, order_id = heap[0]
+                if order_id not in live:
+                    heapq.heappop(heap)
+                    continue
+                level = sign * key
+                # Max-heaps (stored negated) trigger at or below the level, min-heaps at or above
+                if (sign < 0 and price <= level) or (sign > 0 and price >= level):
+                    heapq.heappop(heap)
+                    fired.append(order_id)
+                else:
+                    break
+        return fired
+
+
+class SimulatedBroker:
+    """In-process matching engine for paper trading against replayed or synthetic ticks.
+
+    Market orders fill at the last bid (sells) or ask (buys) and reduce opposite
+    trades first-in first-out, like OANDA's default position fill. Stop-loss and
+    take-profit orders attached on fill are matched against every tick through a
+    TriggerBook and fill at the tick price. Each change is booked through
+    `record(transaction)`, which assigns the transaction id (e.g. the mock server's
+    transaction history); by default ids simply count up. Orders whose stop loss or
+    take profit is already on the wrong side of the market are cancelled, as OANDA does.
+    """
+
+    def __init__(self, balance=100000.0, currency='USD', record=None):
+        self.balance = balance
+        self.currency = currency
+        self.record = record or self._number
+        self._ids = itertools.count(1)
+        self.prices = {}  # instrument -> (bid, ask)
+        self.trades = {}  # trade id -> Trade, in opening order
+        self.orders = {}  # SL/TP order id -> (order transaction, trade id)
+        self.books = {}  # instrument -> TriggerBook
+        self.realized_pl = 0.0
+        self._lock = threading.RLock()
+
+    def on_tick(self, instrument, bid, ask):
+        """Update the price of an instrument and fill any stop-loss or take-profit it reaches."""
+        with self._lock:
+            self.prices[instrument] = (bid, ask)
+            book = self.books.get(instrument)
+            if book is None:
+                return ()
+            fills = []
+            for order_id in book.triggered(bid, ask, self.orders):
+                # An earlier fill in this tick may have cancelled it with its trade
+                entry = self.orders.pop(order_id, None)
+                if entry is None:
+                    continue
+                order, trade_id = entry
+                trade = self.trades.get(trade_id)
+                if trade is None:
+                    continue
+                price = bid if trade.units > 0 else ask
+                fills.append(self._close(trade, trade.units, price, order['type'], order_id))
+            return fills
+
+    def market_order(self, instrument, units, sl=None, tp=None):
+        """Fill a market order; returns (create, fill) transactions, or (create, cancel) without a price."""
+        with self._lock:
+            create = self.record({
+                'type': 'MARKET_ORDER',
+                'instrument': instrument,
+                'units': units,
+                'timeInForce': 'FOK',
+                'positionFill': 'DEFAULT',
+                'stopLossOnFill': {'price': sl} if sl is not None else None,
+                'takeProfitOnFill': {'price': tp} if tp is not None else None,
+                'reason': 'CLIENT_ORDER',
+            })
+            if instrument not in self.prices or not units:
+                cancel = self.record({'type': 'ORDER_CANCEL', 'orderID': create['id'],
+                                      'reason': 'MARKET_HALTED' if units else 'UNITS_INVALID'})
+                return create, cancel
+            bid, ask = self.prices[instrument]
+            price = ask if units > 0 else bid
+            reason = self._on_fill_loss(units, bid, ask, sl, tp)
+            if reason is not None:
+                return create, self.record({'type': 'ORDER_CANCEL', 'orderID': create['id'], 'reason': reason})
+
+            # Reduce opposite trades first, oldest first
+            remaining = units
+            closed = []
+            reduced_trades = []
+            pl = 0.0
+            for trade in list(self.trades.values()):
+                if not remaining:
+                    break
+                if trade.instrument != instrument or (trade.units > 0) == (remaining > 0):
+                    continue
+                size = min(abs(trade.units), abs(remaining))
+                reduced = size if trade.units > 0 else -size
+                trade_pl = self._reduce(trade, reduced, price)
+                reduced_trades.append(trade)
+                closed.append({'tradeID': trade.id, 'units': str(-reduced), 'realizedPL': trade_pl})
+                pl += trade_pl
+                remaining += reduced
+
+            fill = {
+                'type': 'ORDER_FILL',
+                'orderID': create['id'],
+                'instrument': instrument,
+                'units': units,
+                'price': price,
+                'reason': 'MARKET_ORDER',
+                'pl': pl,
+                'accountBalance': self.balance,
+            }
+            if closed:
+                fill['tradesClosed'] = closed
+            if remaining:
+                fill['tradeOpened'] = {'units': str(remaining), 'price': price}
+            fill = self.record(fill)
+            for trade in reduced_trades:
+                self._cancel_linked(trade)
+            if remaining:
+                self._open(fill['id'], instrument, remaining, price, sl, tp)
+                fill['tradeOpened']['tradeID'] = fill['id']
+            return create, fill
+
+    def _number(self, transaction):
+        transaction['id'] = str(next(self._ids))
+        return transaction
+
+    @staticmethod
+    def _on_fill_loss(units, bid, ask, sl, tp):
+        """Cancel reason if the stop loss or take profit would trigger on the current price, else None."""
+        # Longs close on the bid, shorts on the ask
+        if units > 0:
+            if sl is not None and bid <= sl:
+                return 'STOP_LOSS_ON_FILL_LOSS'
+            if tp is not None and bid >= tp:
+                return 'TAKE_PROFIT_ON_FILL_LOSS'
+        else:
+            if sl is not None and ask >= sl:
+                return 'STOP_LOSS_ON_FILL_LOSS'
+            if tp is not None and ask <= tp:
+                return 'TAKE_PROFIT_ON_FILL_LOSS'
+        return None
+
+    def _open(self, trade_id, instrument, units, price, sl, tp):
+        book = self.books.setdefault(instrument, TriggerBook())
+        orders = []
+        for kind, level in (('STOP_LOSS_ORDER', sl), ('TAKE_PROFIT_ORDER', tp)):
+            if level is None:
+                orders.append(None)
+                continue
+            order = self.record({'type': kind, 'tradeID': trade_id, 'price': str(level),
+                                 'timeInForce': 'GTC', 'reason': 'ON_FILL'})
+            self.orders[order['id']] = (order, trade_id)
+            book.add(order['id'], units, float(level), kind == 'STOP_LOSS_ORDER')
+            orders.append(order['id'])
+        self.trades[trade_id] = Trade(trade_id, instrument, units, price, *orders)
+
+    def _reduce(self, trade, units, price):
+        """Close `units` of a trade at `price`, book the realized PnL and return it."""
+        pl = self.to_account(trade.instrument, units * (price - trade.price), price)
+        self.balance += pl
+        self.realized_pl += pl
+        left = trade.units - units
+        if left:
+            self.trades[trade.id] = trade._replace(units=left)
+        else:
+            del self.trades[trade.id]
+        return pl
+
+    def _cancel_linked(self, trade):
+        """Cancel the stop loss and take profit of a trade that is now closed."""
+        if trade.id in self.trades:
+            return
+        for order_id in (trade.sl_order, trade.tp_order):
+            if order_id is not None and self.orders.pop(order_id, None) is not None:
+                self.record({'type': 'ORDER_CANCEL', 'orderID': order_id, 'reason': 'LINKED_TRADE_CLOSED'})
+
+    def _close(self, trade, units, price, reason, order_id):
+        pl = self._reduce(trade, units, price)
+        fill = self.record({
+            'type': 'ORDER_FILL',
+            'orderID': order_id,
+            'instrument': trade.instrument,
+            'units': -units,
+            'price': price,
+            'reason': reason,
+            'pl': pl,
+            'accountBalance': self.balance,
+            'tradesClosed': [{'tradeID': trade.id, 'units': str(-units), 'realizedPL': pl}],
+        })
+        self._cancel_linked(trade)
+        return fill
+
+    def to_account(self, instrument, amount, price):
+        """Convert an amount in the instrument's quote currency to the account currency."""
+        base, quote = instrument.split('_')
+        if quote == self.currency:
+            return amount
+        if base == self.currency:
+            return amount / price
+        for pair, invert in ((f"{quote}_{self.currency}", False), (f"{self.currency}_{quote}", True)):
+            if pair in self.prices:
+                mid = sum(self.prices[pair]) / 2
+                return amount / mid if invert else amount * mid
+        return amount
+
+    def positions(self):
+        """Net units per instrument."""
+        with self._lock:
+            net = {}
+            for trade in self.trades.values():
+                net[trade.instrument] = net.get(trade.instrument, 0) + trade.units
+            return {instrument: units for instrument, units in net.items() if units}
+
+    def unrealized_pl(self):
+        with self._lock:
+            total = 0.0
+            for trade in self.trades.values():
+                if trade.instrument in self.prices:
+                    bid, ask = self.prices[trade.instrument]
+                    price = bid if trade.units > 0 else ask
+                    total += self.to_account(trade.instrument, trade.units * (price - trade.price), price)
+            return total
+
+    def pending_orders(self):
+        with self._lock:
+            return [dict(order, state='PENDING') for order, _ in self.orders.values()]
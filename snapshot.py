@@ -0,0 +1,45 @@
+import os
+import pickle
+import time
+import traceback
+
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, "snapshot.pkl")
+
+
+def save_snapshot(path, states):
+    """Write the candle and indicator state of every instrument, atomically."""
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'time': time.time(),
+        'instruments': {name: state.snapshot() for name, state in states.items()},
+    }
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"Error writing snapshot {path}: {e}")
+        traceback.print_exc()
+        return False
+
+
+def load_snapshot(path):
+    """Per-instrument snapshots from `path`, or {} if it is missing, unreadable or outdated."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'rb') as file:
+            data = pickle.load(file)
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return {}
+    if data.get('version') != SNAPSHOT_VERSION:
+        print(f"Ignoring snapshot {path} from another version")
+        return {}
+    return data['instruments']
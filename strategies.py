@@ -0,0 +1,119 @@
+import math
+from collections import namedtuple
+
+Signal = namedtuple('Signal', ['strategy', 'side', 'value', 'sl', 'tp'])
+
+
+class Strategy:
+    """Base class for strategies evaluated on every closed bar of one timeframe.
+
+    Subclasses list the indicator keys they read in `indicators` (e.g. ('rsi', 14));
+    the instrument's shared IndicatorGraph computes each key once per bar for all
+    strategies. `on_bar` returns a Signal or None.
+    """
+
+    name = 'strategy'
+
+    def __init__(self, granularity='M1', sl=25, tp=25):
+        self.granularity = granularity
+        self.sl = sl
+        self.tp = tp
+        self.indicators = ()
+
+    def signal(self, side, value):
+        return Signal(self.name, side, value, self.sl, self.tp)
+
+    def on_bar(self, state):
+        raise NotImplementedError
+
+
+class RsiStrategy(Strategy):
+    """Buy when RSI is oversold, sell when it is overbought."""
+
+    name = 'rsi'
+
+    def __init__(self, length=14, oversold=30, overbought=70, granularity='M1', sl=25, tp=25):
+        super().__init__(granularity, sl, tp)
+        self.key = ('rsi', length)
+        self.indicators = (self.key,)
+        self.oversold = oversold
+        self.overbought = overbought
+
+    def on_bar(self, state):
+        rsi = state.indicators.value(self.key)
+        if rsi is None or math.isnan(rsi):
+            print("No rsi data. Not getting into a trade yet")
+            return None
+        if rsi < self.oversold:
+            return self.signal('buy', rsi)
+        if rsi > self.overbought:
+            return self.signal('sell', rsi)
+        return None
+
+
+class MovingAverageCrossStrategy(Strategy):
+    """Buy when the EMA crosses above the SMA, sell when it crosses below."""
+
+    name = 'ma_cross'
+
+    def __init__(self, ema_length=10, sma_length=10, granularity='M1', sl=25, tp=25):
+        super().__init__(granularity, sl, tp)
+        self.ema_key = ('ema', ema_length)
+        self.sma_key = ('sma', sma_length)
+        self.indicators = (self.ema_key, self.sma_key)
+
+    def on_bar(self, state):
+        candles = state.candles
+        if len(candles) < 2:
+            return None
+        columns = state.indicators.columns
+        ema = candles.column(columns[self.ema_key])[-2:]
+        sma = candles.column(columns[self.sma_key])[-2:]
+        before, now = ema[0] - sma[0], ema[1] - sma[1]
+        if before <= 0 < now:
+            return self.signal('buy', now)
+        if before >= 0 > now:
+            return self.signal('sell', now)
+        return None
+
+
+# Strategies selectable by name on the command line
+STRATEGIES = {
+    RsiStrategy.name: RsiStrategy,
+    MovingAverageCrossStrategy.name: MovingAverageCrossStrategy,
+}
+
+
+class StrategyEngine:
+    """Strategies registered per instrument, grouped by the timeframe they run on."""
+
+    def __init__(self):
+        self.registry = {}  # (instrument, granularity) -> [Strategy]
+
+    def register(self, instrument, strategy):
+        self.registry.setdefault((instrument, strategy.granularity), []).append(strategy)
+
+    def strategies_for(self, instrument, granularity):
+        return self.registry.get((instrument, granularity), ())
+
+    def required_indicators(self, instrument):
+        """{granularity: [indicator keys]} needed by the instrument's strategies, without duplicates."""
+        required = {}
+        for (name, granularity), strategies in self.registry.items():
+            if name != instrument:
+                continue
+            keys = required.setdefault(granularity, [])
+            for strategy in strategies:
+                for key in strategy.indicators:
+                    if key not in keys:
+                        keys.append(key)
+        return required
+
+    def evaluate(self, state, granularity):
+        """Run the strategies on a closed bar; returns their signals."""
+        signals = []
+        for strategy in self.strategies_for(state.instrument, granularity):
+            signal = strategy.on_bar(state)
+            if signal is not None:
+                signals.append(signal)
+        return signals
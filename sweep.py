@@ -0,0 +1,138 @@
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from backtest import backtest, load_candles, session_mask
+from indicators import batch_rsi
+
+SHARED_COLUMNS = ('start_time', 'h', 'l', 'c', 'mask')
+
+# Per-worker views on the shared arrays, set by _attach()
+_worker = {}
+
+
+def share_arrays(arrays):
+    """Copy arrays into shared memory blocks; returns (blocks, specs) for the workers."""
+    blocks = []
+    specs = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        blocks.append(block)
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def _attach(specs):
+    """Worker initializer: map the shared blocks as read-only arrays instead of unpickling them."""
+    _worker['blocks'] = []
+    candles = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.flags.writeable = False
+        _worker['blocks'].append(block)
+        candles[name] = array
+    _worker['candles'] = candles
+    _worker['rsi'] = {}
+
+
+def _evaluate(params):
+    """Backtest one parameter set in a worker, reusing RSI arrays per length."""
+    candles = _worker['candles']
+    length = params['rsi_length']
+    rsi = _worker['rsi'].get(length)
+    if rsi is None:
+        rsi = batch_rsi(candles['c'], length)
+        _worker['rsi'][length] = rsi
+    report, _ = backtest(candles, mask=candles['mask'], rsi=rsi, **params)
+    return {**params, **report}
+
+
+def parameter_grid(space):
+    """Every combination of a {parameter: [values]} space."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_search(space, samples, seed=None):
+    """`samples` distinct random combinations drawn from a {parameter: [values]} space."""
+    grid = parameter_grid(space)
+    if samples >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, samples)
+
+
+def run_sweep(candles, combinations, workers=None, rank_by='pnl', chunksize=None):
+    """Backtest every combination on a process pool and return results ranked by `rank_by`."""
+    workers = workers or os.cpu_count()
+    arrays = {name: candles[name] for name in SHARED_COLUMNS if name != 'mask'}
+    arrays['mask'] = session_mask(candles['start_time'])
+    blocks, specs = share_arrays(arrays)
+    if chunksize is None:
+        chunksize = max(1, len(combinations) // (workers * 8))
+    # Group combinations by RSI length so each worker computes few RSI arrays
+    combinations = sorted(combinations, key=lambda params: params['rsi_length'])
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as executor:
+            results = list(executor.map(_evaluate, combinations, chunksize=chunksize))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return pd.DataFrame(results).sort_values(rank_by, ascending=False, ignore_index=True)
+
+
+def _values(text, kind=float):
+    return [kind(value) for value in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep RSI strategy parameters over historical candles")
+    parser.add_argument('path', help="Candle file (.csv, .parquet or .bin)")
+    parser.add_argument('--rsi-length', default="7,14,21", help="Comma-separated values to try")
+    parser.add_argument('--oversold', default="20,25,30")
+    parser.add_argument('--overbought', default="70,75,80")
+    parser.add_argument('--sl', default="15,25,40")
+    parser.add_argument('--tp', default="15,25,40")
+    parser.add_argument('--leverage', default="15")
+    parser.add_argument('--random', type=int, default=None, help="Evaluate this many random combinations instead of the full grid")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rank-by', default='pnl')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', default=None, help="Write the ranked results to this CSV file")
+    args = parser.parse_args()
+
+    space = {
+        'rsi_length': _values(args.rsi_length, int),
+        'oversold': _values(args.oversold),
+        'overbought': _values(args.overbought),
+        'sl': _values(args.sl),
+        'tp': _values(args.tp),
+        'leverage': _values(args.leverage),
+    }
+    if args.random:
+        combinations = random_search(space, args.random, args.seed)
+    else:
+        combinations = parameter_grid(space)
+
+    candles = load_candles(args.path)
+    started = time.perf_counter()
+    results = run_sweep(candles, combinations, workers=args.workers, rank_by=args.rank_by)
+    elapsed = time.perf_counter() - started
+
+    print(results.head(args.top).to_string())
+    print(f"Evaluated {len(results)} combinations in {elapsed:.2f}s ({len(results) / elapsed:.1f}/s)")
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import json
+import time
+import numpy as np
+
+# Rough starting mids for common pairs; anything else starts at 1.0
+START_PRICES = {
+    'EUR_USD': 1.08, 'GBP_USD': 1.27, 'USD_JPY': 150.0, 'AUD_USD': 0.66, 'USD_CAD': 1.36,
+    'USD_CHF': 0.88, 'NZD_USD': 0.60, 'EUR_GBP': 0.85, 'EUR_JPY': 162.0, 'GBP_JPY': 190.0,
+}
+LIQUIDITY = np.array([500000, 2500000, 2000000, 5000000, 10000000])
+
+
+def format_tick_time(epoch):
+    """RFC3339 timestamp with nanoseconds, as OANDA sends them."""
+    seconds = int(epoch)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))}.{int((epoch - seconds) * 1e9):09d}Z"
+
+
+class SyntheticTickSource:
+    """Generates OANDA-style PRICE ticks for many instruments from geometric Brownian motion.
+
+    Each tick goes to a randomly chosen instrument, at `rate` ticks per second in
+    total, with exponential inter-arrival times (`jitter=0` for a fixed interval).
+    Each tick is stamped with the wall-clock time it was generated, so a consumer can
+    measure how far behind it is. Random numbers are drawn in NumPy batches.
+    """
+
+    def __init__(self, instruments, rate=100.0, spread_pips=1.0, volatility=0.1, jitter=1.0,
+                 levels=6, seed=None, batch=4096):
+        self.instruments = list(instruments)
+        self.rate = rate
+        self.jitter = jitter
+        self.levels = levels
+        self.batch = batch
+        self.rng = np.random.default_rng(seed)
+        self.prices = np.array([START_PRICES.get(name, 1.0) for name in self.instruments])
+        pips = np.array([0.01 if 'JPY' in name else 0.0001 for name in self.instruments])
+        self.half_spread = spread_pips * pips / 2
+        # Per-tick volatility for an annualised `volatility`, one tick every len/rate seconds
+        seconds_per_year = 252 * 24 * 3600
+        self.tick_sigma = volatility * np.sqrt(len(self.instruments) / (rate * seconds_per_year))
+
+    def _batches(self):
+        n = self.batch
+        while True:
+            which = self.rng.integers(0, len(self.instruments), n)
+            shocks = np.exp(self.rng.normal(-0.5 * self.tick_sigma ** 2, self.tick_sigma, n))
+            if self.jitter:
+                gaps = self.rng.exponential(1.0 / self.rate, n)
+            else:
+                gaps = np.full(n, 1.0 / self.rate)
+            liquidity = self.rng.choice(LIQUIDITY, (n, 2, self.levels))
+            yield which, shocks, gaps, liquidity
+
+    def generate(self, count, start_epoch):
+        """Return `count` ticks stamped on a simulated clock starting at `start_epoch`, without pacing."""
+        ticks = []
+        epoch = start_epoch
+        for which, shocks, gaps, liquidity in self._batches():
+            for i in range(min(len(which), count - len(ticks))):
+                epoch += gaps[i]
+                k = which[i]
+                self.prices[k] *= shocks[i]
+                ticks.append(self.make_tick(k, epoch, liquidity[i]))
+            if len(ticks) >= count:
+                return ticks
+
+    def _paced(self, duration):
+        """Yield ticks in real time, and None whenever the generator is about to sleep."""
+        started = time.time()
+        scheduled = started
+        for which, shocks, gaps, liquidity in self._batches():
+            for i in range(len(which)):
+                scheduled += gaps[i]
+                now = time.time()
+                if duration is not None and now - started >= duration:
+                    return
+                if scheduled > now:
+                    yield None
+                    time.sleep(max(scheduled - time.time(), 0))
+                    now = scheduled
+                k = which[i]
+                self.prices[k] *= shocks[i]
+                yield self.make_tick(k, now, liquidity[i])
+
+    def ticks(self, duration=None):
+        """Yield tick dicts in real time, for `duration` seconds or forever."""
+        for tick in self._paced(duration):
+            if tick is not None:
+                yield tick
+
+    def make_tick(self, k, epoch, liquidity):
+        mid = self.prices[k]
+        decimals = 3 if 'JPY' in self.instruments[k] else 5
+        bid = f"{mid - self.half_spread[k]:.{decimals}f}"
+        ask = f"{mid + self.half_spread[k]:.{decimals}f}"
+        return {
+            "type": "PRICE",
+            "time": format_tick_time(epoch),
+            "bids": [{"price": bid, "liquidity": int(amount)} for amount in liquidity[0]],
+            "asks": [{"price": ask, "liquidity": int(amount)} for amount in liquidity[1]],
+            "closeoutBid": bid,
+            "closeoutAsk": ask,
+            "status": "tradeable",
+            "tradeable": True,
+            "instrument": self.instruments[k],
+        }
+
+    def lines(self, duration=None, heartbeat=5.0, max_buffered=256, on_tick=None):
+        """Yield newline-delimited compact JSON like the pricing stream, with periodic heartbeats.
+
+        Lines are sent in chunks whenever the generator idles, so high rates do not cost
+        one socket write per tick. `on_tick` is called with each tick before it is sent.
+        """
+        last_heartbeat = time.time()
+        buffer = []
+        for tick in self._paced(duration):
+            if tick is not None:
+                if on_tick is not None:
+                    on_tick(tick)
+                buffer.append(json.dumps(tick, separators=(',', ':')))
+                now = time.time()
+                if now - last_heartbeat >= heartbeat:
+                    last_heartbeat = now
+                    buffer.append(json.dumps({'type': 'HEARTBEAT', 'time': format_tick_time(now)}, separators=(',', ':')))
+                if len(buffer) < max_buffered:
+                    continue
+            if buffer:
+                yield "\n".join(buffer) + "\n"
+                buffer = []
+        if buffer:
+            yield "\n".join(buffer) + "\n"
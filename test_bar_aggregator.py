@@ -0,0 +1,98 @@
+from bar_aggregator import BarAggregator
+
+
+def test_first_window_is_dropped():
+    aggregator = BarAggregator()
+    assert aggregator.update(30, 1.0) == []
+    # The window joined part-way through closes without being emitted
+    assert aggregator.update(60, 1.1) == []
+    assert aggregator.update(120, 1.2) == [(60, 1.1, 1.1, 1.1, 1.1, 1)]
+
+
+def test_keep_first_window():
+    aggregator = BarAggregator(drop_first=False)
+    aggregator.update(30, 1.0)
+    assert aggregator.update(60, 1.1) == [(0, 1.0, 1.0, 1.0, 1.0, 1)]
+
+
+def test_bucket_boundaries():
+    aggregator = BarAggregator(drop_first=False)
+    aggregator.update(60, 1.0)
+    aggregator.update(90, 1.3)
+    aggregator.update(100, 0.9)
+    # The last second of a window still belongs to it
+    assert aggregator.update(119, 1.1) == ()
+    # The first second of the next window closes it
+    assert aggregator.update(120, 1.2) == [(60, 1.0, 1.3, 0.9, 1.1, 4)]
+
+
+def test_late_tick_is_folded_into_the_open_bar():
+    aggregator = BarAggregator(drop_first=False)
+    aggregator.update(60, 1.0)
+    aggregator.update(125, 1.2)
+    # A tick stamped in the closed window goes to the open one
+    assert aggregator.update(110, 1.5) == ()
+    assert aggregator.update(180, 1.3) == [(120, 1.2, 1.5, 1.2, 1.5, 2)]
+
+
+def test_heartbeat_closes_without_opening_a_bar():
+    aggregator = BarAggregator(drop_first=False)
+    aggregator.update(60, 1.0)
+    assert aggregator.advance(100) == ()
+    assert aggregator.advance(125) == [(60, 1.0, 1.0, 1.0, 1.0, 1)]
+    assert aggregator.bar is None
+    # The window takes its open, high and low from its first tick
+    aggregator.update(130, 1.2)
+    aggregator.update(140, 1.1)
+    assert aggregator.update(180, 1.4) == [(120, 1.2, 1.2, 1.1, 1.1, 2)]
+
+
+def test_late_tick_after_heartbeat_close_goes_to_the_next_window():
+    aggregator = BarAggregator(drop_first=False)
+    aggregator.update(60, 1.0)
+    aggregator.advance(125)
+    # Window 60 has already been emitted, so the late tick joins window 120
+    assert aggregator.update(110, 1.5) == []
+    assert aggregator.update(180, 1.3) == [(120, 1.5, 1.5, 1.5, 1.5, 1)]
+
+
+def test_empty_windows_are_filled_flat():
+    aggregator = BarAggregator(drop_first=False)
+    aggregator.update(60, 1.0)
+    aggregator.update(70, 1.1)
+    assert aggregator.update(250, 1.2) == [
+        (60, 1.0, 1.1, 1.0, 1.1, 2),
+        (120, 1.1, 1.1, 1.1, 1.1, 0),
+        (180, 1.1, 1.1, 1.1, 1.1, 0),
+    ]
+
+
+def test_heartbeats_fill_empty_windows_once():
+    aggregator = BarAggregator(drop_first=False)
+    aggregator.update(60, 1.0)
+    assert aggregator.advance(190) == [
+        (60, 1.0, 1.0, 1.0, 1.0, 1),
+        (120, 1.0, 1.0, 1.0, 1.0, 0),
+    ]
+    assert aggregator.advance(200) == []
+    assert aggregator.advance(245) == [(180, 1.0, 1.0, 1.0, 1.0, 0)]
+    assert aggregator.update(250, 1.2) == []
+
+
+def test_empty_windows_are_skipped_without_fill():
+    aggregator = BarAggregator(fill_empty=False, drop_first=False)
+    aggregator.update(60, 1.0)
+    assert aggregator.advance(300) == [(60, 1.0, 1.0, 1.0, 1.0, 1)]
+    assert aggregator.update(310, 1.2) == []
+    assert aggregator.update(360, 1.3) == [(300, 1.2, 1.2, 1.2, 1.2, 1)]
+
+
+def test_reset_drops_the_open_bar_and_the_next_window():
+    aggregator = BarAggregator(drop_first=False)
+    aggregator.update(60, 1.0)
+    aggregator.update(120, 1.1)
+    aggregator.reset()
+    # Nothing is filled across the break and the window joined after it is dropped
+    assert aggregator.update(610, 1.2) == []
+    assert aggregator.update(660, 1.3) == []
+    assert aggregator.update(720, 1.4) == [(660, 1.3, 1.3, 1.3, 1.3, 1)]
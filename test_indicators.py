@@ -0,0 +1,13 @@
+import numpy as np
+import pytest
+from indicators import compare_with_pandas_ta
+
+
+def test_streaming_indicators_match_pandas_ta():
+    pytest.importorskip("pandas_ta")
+    rng = np.random.default_rng(0)
+    prices = 1.10 + np.cumsum(rng.normal(0, 0.0002, 5000))
+    differences = compare_with_pandas_ta(prices)
+    assert set(differences) == {'ema_10', 'sma_10', 'rsi_14'}
+    for name, difference in differences.items():
+        assert difference <= 1e-9, name
@@ -0,0 +1,40 @@
+from sim_broker import SimulatedBroker
+
+
+def test_default_record_numbers_transactions():
+    broker = SimulatedBroker()
+    broker.on_tick('EUR_USD', 1.1000, 1.1002)
+    create, fill = broker.market_order('EUR_USD', 100)
+    assert (create['id'], fill['id']) == ('1', '2')
+    assert fill['type'] == 'ORDER_FILL'
+
+
+def test_short_keeps_levels_above_and_below_the_ask():
+    broker = SimulatedBroker()
+    broker.on_tick('EUR_USD', 1.1000, 1.1002)
+    _, fill = broker.market_order('EUR_USD', -100, sl=1.1027, tp=1.0977)
+    assert fill['type'] == 'ORDER_FILL'
+    assert fill['price'] == 1.1000
+
+    # Nothing triggers while the market stands still
+    assert broker.on_tick('EUR_USD', 1.1000, 1.1002) == []
+    assert broker.positions() == {'EUR_USD': -100}
+
+    # The take profit closes the short on the ask
+    fills = broker.on_tick('EUR_USD', 1.0974, 1.0976)
+    assert [f['reason'] for f in fills] == ['TAKE_PROFIT_ORDER']
+    assert broker.positions() == {}
+    assert broker.balance > 100000.0
+
+
+def test_wrong_side_levels_are_cancelled():
+    broker = SimulatedBroker()
+    broker.on_tick('EUR_USD', 1.1000, 1.1002)
+    # A short with its take profit above the market would close at a loss at once
+    _, cancel = broker.market_order('EUR_USD', -100, sl=1.0975, tp=1.1025)
+    assert cancel['type'] == 'ORDER_CANCEL'
+    assert cancel['reason'] == 'STOP_LOSS_ON_FILL_LOSS'
+    _, cancel = broker.market_order('EUR_USD', 100, sl=1.0975, tp=1.0990)
+    assert cancel['reason'] == 'TAKE_PROFIT_ON_FILL_LOSS'
+    assert broker.trades == {}
+    assert broker.balance == 100000.0
@@ -0,0 +1,234 @@
+import calendar
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import traceback
+import zlib
+import numpy as np
+from bar_aggregator import parse_timestamp, roll_up
+from stream_decoder import loads
+
+# One fixed-width record per tick; files hold these columns chunk by chunk
+TICK_RECORD = np.dtype([
+    ('time', '<i8'),  # epoch nanoseconds
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('bid_liquidity', '<i8'),
+    ('ask_liquidity', '<i8'),
+    ('status', 'u1'),
+])
+STATUSES = ('tradeable', 'non-tradeable', 'invalid')
+STATUS_CODES = {name: code for code, name in enumerate(STATUSES)}
+
+# Each chunk: first and last tick time, row count and compressed size, then the
+# zlib-compressed columns one after another
+CHUNK_HEADER = struct.Struct('<qqII')
+NANOSECONDS = 1_000_000_000
+DAY_NS = 86400 * NANOSECONDS
+
+
+def parse_time_ns(timestamp):
+    """Epoch nanoseconds of an RFC3339 or UNIX OANDA timestamp."""
+    if timestamp[4] != '-':
+        seconds, _, fraction = timestamp.partition('.')
+        return int(seconds) * NANOSECONDS + int(fraction[:9].ljust(9, '0'))
+    fraction = timestamp[20:-1] if len(timestamp) > 20 else ''
+    return parse_timestamp(timestamp) * NANOSECONDS + int(fraction[:9].ljust(9, '0'))
+
+
+def tick_file_path(directory, instrument, day):
+    """Path of the tick file for one instrument and UTC day (days since the epoch)."""
+    date = time.strftime('%Y-%m-%d', time.gmtime(day * 86400))
+    return os.path.join(directory, instrument, f"{date}.ticks")
+
+
+def encode_chunk(records, level=6):
+    columns = b"".join(np.ascontiguousarray(records[name]).tobytes() for name in TICK_RECORD.names)
+    payload = zlib.compress(columns, level)
+    header = CHUNK_HEADER.pack(int(records['time'][0]), int(records['time'][-1]), len(records), len(payload))
+    return header + payload
+
+
+def decode_chunk(payload, rows):
+    columns = zlib.decompress(payload)
+    records = np.empty(rows, dtype=TICK_RECORD)
+    offset = 0
+    for name in TICK_RECORD.names:
+        records[name] = np.frombuffer(columns, dtype=TICK_RECORD[name], count=rows, offset=offset)
+        offset += rows * TICK_RECORD[name].itemsize
+    return records
+
+
+def chunk_index(buffer):
+    """(first_time, last_time, rows, payload offset, payload size) of each complete chunk."""
+    index = []
+    offset = 0
+    while offset + CHUNK_HEADER.size <= len(buffer):
+        first, last, rows, size = CHUNK_HEADER.unpack_from(buffer, offset)
+        start = offset + CHUNK_HEADER.size
+        if start + size > len(buffer):
+            break  # Partial chunk left by a crash
+        index.append((first, last, rows, start, size))
+        offset = start + size
+    return index
+
+
+def read_tick_file(path, start=None, end=None):
+    """Ticks of one file with start <= time < end (epoch ns) as a TICK_RECORD array.
+
+    The file is memory-mapped and only the chunks overlapping the range are
+    decompressed; chunk headers carry their time range, so the rest are skipped.
+    """
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return np.zeros(0, dtype=TICK_RECORD)
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        parts = []
+        for first, last, rows, offset, size in chunk_index(buffer):
+            if (start is not None and last < start) or (end is not None and first >= end):
+                continue
+            parts.append(decode_chunk(buffer[offset:offset + size], rows))
+    if not parts:
+        return np.zeros(0, dtype=TICK_RECORD)
+    records = np.concatenate(parts)
+    if start is not None or end is not None:
+        times = records['time']
+        keep = np.ones(len(records), dtype=bool)
+        if start is not None:
+            keep &= times >= start
+        if end is not None:
+            keep &= times < end
+        records = records[keep]
+    return records
+
+
+def read_ticks(directory, instrument, start=None, end=None):
+    """Recorded ticks of an instrument between epoch seconds `start` and `end`, across daily files."""
+    folder = os.path.join(directory, instrument)
+    if not os.path.isdir(folder):
+        return np.zeros(0, dtype=TICK_RECORD)
+    start_ns = None if start is None else int(start * NANOSECONDS)
+    end_ns = None if end is None else int(end * NANOSECONDS)
+    parts = []
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith('.ticks'):
+            continue
+        day_start = calendar.timegm(time.strptime(name[:-6], '%Y-%m-%d'))
+        if (end is not None and day_start >= end) or (start is not None and day_start + 86400 <= start):
+            continue
+        parts.append(read_tick_file(os.path.join(folder, name), start_ns, end_ns))
+    if not parts:
+        return np.zeros(0, dtype=TICK_RECORD)
+    return np.concatenate(parts)
+
+
+def price_fields(data):
+    """(instrument, time, bid, ask, bid liquidity, ask liquidity, status) of a PRICE message."""
+    bid = data['bids'][0]
+    ask = data['asks'][0]
+    status = data.get('status') or ('tradeable' if data.get('tradeable') else 'non-tradeable')
+    return (data['instrument'], data['time'], bid['price'], ask['price'],
+            bid.get('liquidity', 0), ask.get('liquidity', 0), status)
+
+
+def ticks_to_candles(ticks, timeframe=60):
+    """Bid OHLC candles (tick count as volume) from recorded ticks, as backtest columns."""
+    seconds = ticks['time'] // NANOSECONDS
+    bid = ticks['bid']
+    return roll_up({'start_time': seconds, 'o': bid, 'h': bid, 'l': bid, 'c': bid,
+                    'volume': np.ones(len(ticks), dtype=np.int64)}, timeframe)
+
+
+class TickRecorder(threading.Thread):
+    """Background writer appending every pricing tick to daily compressed tick files.
+
+    `record` and `record_line` run on the stream thread and only queue a few fields or the raw line;
+    parsing, chunking, compression and disk writes happen on this thread. Ticks are
+    written in chunks of `chunk_rows`, or every `flush_interval` seconds when the
+    stream is quiet, so a crash loses at most one interval.
+    """
+
+    def __init__(self, directory, chunk_rows=4096, flush_interval=5.0, level=6):
+        super().__init__(daemon=True, name="tick-recorder")
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.level = level
+        self.queue = queue.SimpleQueue()
+        self.buffers = {}  # instrument -> list of tick tuples
+        self.written = 0
+        self.dropped = 0
+        self._stop_event = threading.Event()
+
+    def record(self, data):
+        """Queue one PRICE message from the stream."""
+        try:
+            self.queue.put(price_fields(data))
+        except (KeyError, IndexError):
+            self.dropped += 1
+
+    def record_line(self, line):
+        """Queue one raw PRICE line from the stream; it is parsed on this thread."""
+        self.queue.put(line)
+
+    def run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                self._add(item)
+            if self._stop_event.is_set() and self.queue.empty():
+                break
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = time.monotonic()
+        self.flush()
+
+    def _add(self, item):
+        try:
+            if isinstance(item, bytes):
+                item = price_fields(loads(item))
+            instrument, timestamp, bid, ask, bid_liquidity, ask_liquidity, status = item
+            tick = (parse_time_ns(timestamp), float(bid), float(ask), int(bid_liquidity),
+                    int(ask_liquidity), STATUS_CODES.get(status, len(STATUSES) - 1))
+        except (ValueError, TypeError, KeyError, IndexError):
+            self.dropped += 1
+            return
+        buffer = self.buffers.setdefault(instrument, [])
+        if buffer and buffer[-1][0] // DAY_NS != tick[0] // DAY_NS:
+            self._write(instrument)  # A new day starts a new file
+            buffer = self.buffers[instrument]
+        buffer.append(tick)
+        if len(buffer) >= self.chunk_rows:
+            self._write(instrument)
+
+    def _write(self, instrument):
+        ticks = self.buffers.get(instrument)
+        if not ticks:
+            return
+        self.buffers[instrument] = []
+        records = np.array(ticks, dtype=TICK_RECORD)
+        path = tick_file_path(self.directory, instrument, int(records['time'][0] // DAY_NS))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'ab') as file:
+                file.write(encode_chunk(records, self.level))
+            self.written += len(records)
+        except OSError as e:
+            print(f"Error writing ticks to {path}: {e}")
+            traceback.print_exc()
+
+    def flush(self):
+        for instrument in list(self.buffers):
+            self._write(instrument)
+
+    def stop(self, timeout=10):
+        """Write everything still queued, then stop the thread."""
+        self._stop_event.set()
+        self.queue.put(None)
+        self.join(timeout)